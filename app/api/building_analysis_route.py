@@ -11,6 +11,8 @@ import uuid
 from datetime import datetime
 
 from app.db.database import get_db
+from app.core import response_cache
+from app.core.geojson_validation import boundary_feature_error
 from app.core.data_manager import CimWizardDataManager
 from app.core.pipeline_executor import CimWizardPipelineExecutor
 from app.models.vector import Building, BuildingProperties, ProjectScenario
@@ -109,6 +111,8 @@ def save_scenario_to_database(
             scenario.updated_at = datetime.utcnow()
         
         db.commit()
+        # Project listings and dashboard are cached
+        response_cache.invalidate("projects")
         return True
         
     except Exception as e:
@@ -365,6 +369,10 @@ async def execute_building_analysis(
         else:
             scenario_geo_input = project_boundary
         
+        error = boundary_feature_error(scenario_geo_input)
+        if error:
+            raise HTTPException(status_code=400, detail=f"Invalid project_boundary: {error}")
+        
         # Set the initial input data
         data_manager.set_feature('scenario_geo', scenario_geo_input)
         data_manager.set_feature('project_boundary', project_boundary)
@@ -651,5 +659,7 @@ async def execute_building_analysis(
         
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -4,6 +4,7 @@ FastAPI implementation for CIM Wizard Integrated
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 import json
@@ -30,10 +31,10 @@ async def census_spatial(
         # Initialize census service
         census_service = CensusService(db_session=db)
         
-        # Get census data
-        result = census_service.get_census_by_polygon(polygon_array)
+        # Get census data, already serialized as GeoJSON
+        body = census_service.get_census_by_polygon_geojson(polygon_array)
         
-        return result
+        return Response(content=body, media_type="application/json")
         
     except HTTPException:
         raise
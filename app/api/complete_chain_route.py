@@ -13,7 +13,9 @@ import uuid
 
 from app.db.database import get_db
 from app.core.data_manager import CimWizardDataManager
+from app.core.geojson_validation import boundary_feature_error
 from app.core.pipeline_executor import CimWizardPipelineExecutor
+from app.core.statistics import compute_list_statistics
 
 router = APIRouter()
 
@@ -88,6 +90,10 @@ async def execute_complete_chain(
         else:
             scenario_geo_input = project_boundary
         
+        error = boundary_feature_error(scenario_geo_input)
+        if error:
+            raise HTTPException(status_code=400, detail=f"Invalid project_boundary: {error}")
+        
         # Set the initial input data
         data_manager.set_feature('scenario_geo', scenario_geo_input)
         data_manager.set_feature('project_boundary', project_boundary)
@@ -442,34 +448,37 @@ def generate_summary_statistics(execution_results, data_manager):
     summary["total_buildings_in_census"] = execution_results.get("buildings_in_census", 0)
     summary["total_buildings_in_project"] = execution_results.get("buildings_in_project", 0)
     
+    # Per-building features are lists; calculators called without inputs store dict defaults
     # Height statistics
-    if building_heights and isinstance(building_heights, list):
-        summary["average_height_m"] = round(sum(building_heights) / len(building_heights), 2) if building_heights else 0
-        summary["max_height_m"] = round(max(building_heights), 2) if building_heights else 0
-        summary["min_height_m"] = round(min(building_heights), 2) if building_heights else 0
+    if isinstance(building_heights, list) and building_heights:
+        avg_height, max_height, min_height, _ = compute_list_statistics(building_heights)
+        summary["average_height_m"] = round(avg_height, 2)
+        summary["max_height_m"] = round(max_height, 2)
+        summary["min_height_m"] = round(min_height, 2)
     
     # Area statistics
-    if building_areas and isinstance(building_areas, list):
-        summary["total_area_m2"] = round(sum(building_areas), 2)
-        summary["average_area_m2"] = round(sum(building_areas) / len(building_areas), 2) if building_areas else 0
+    if isinstance(building_areas, list) and building_areas:
+        total_area = sum(building_areas)
+        summary["total_area_m2"] = round(total_area, 2)
+        summary["average_area_m2"] = round(total_area / len(building_areas), 2)
     
     # Volume statistics
-    if building_volumes and isinstance(building_volumes, list):
-        summary["total_volume_m3"] = round(sum(building_volumes), 2)
-        summary["average_volume_m3"] = round(sum(building_volumes) / len(building_volumes), 2) if building_volumes else 0
+    if isinstance(building_volumes, list) and building_volumes:
+        total_volume = sum(building_volumes)
+        summary["total_volume_m3"] = round(total_volume, 2)
+        summary["average_volume_m3"] = round(total_volume / len(building_volumes), 2)
     
     # Population statistics
-    if census_population:
+    if census_population is not None:
         summary["total_census_population"] = census_population
     
-    if building_populations and isinstance(building_populations, list):
-        summary["total_distributed_population"] = round(sum(building_populations), 2)
-        summary["average_population_per_building"] = round(
-            sum(building_populations) / len(building_populations), 2
-        ) if building_populations else 0
+    if isinstance(building_populations, list) and building_populations:
+        total_population = sum(building_populations)
+        summary["total_distributed_population"] = round(total_population, 2)
+        summary["average_population_per_building"] = round(total_population / len(building_populations), 2)
     
     # Building type distribution
-    if building_types and isinstance(building_types, list):
+    if isinstance(building_types, list) and building_types:
         type_counts = {}
         for btype in building_types:
             type_counts[btype] = type_counts.get(btype, 0) + 1
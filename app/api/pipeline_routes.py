@@ -5,13 +5,15 @@ FastAPI implementation for CIM Wizard Integrated
 
 from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import json
 
 from app.db.database import get_db
 from app.models.vector import ProjectScenario, Building, BuildingProperties
 from app.core.data_manager import CimWizardDataManager
 from app.core.pipeline_executor import CimWizardPipelineExecutor
+from app.core.geojson_validation import boundary_feature_error, geometry_error
+from app.core.statistics import compute_list_statistics
 # Removed Pydantic schemas for simplicity - using dict instead
 
 
@@ -27,6 +29,14 @@ def get_pipeline_executor(db: Session):
     return executor, data_manager
 
 
+def check_input_data(input_data: Optional[Dict[str, Any]]):
+    """Reject a malformed scenario_geo passed as pipeline input before any pipeline work"""
+    if input_data and 'scenario_geo' in input_data:
+        error = boundary_feature_error(input_data['scenario_geo'])
+        if error:
+            raise HTTPException(status_code=400, detail=f"Invalid scenario_geo: {error}")
+
+
 @router.post("/execute")
 async def execute_pipeline(
     request_data: dict,
@@ -49,6 +59,7 @@ async def execute_pipeline(
         features = request_data.get('features', [])
         parallel = request_data.get('parallel', False)
         input_data = request_data.get('input_data')
+        check_input_data(input_data)
         
         if not project_id:
             return {"error": "Missing project_id"}
@@ -88,6 +99,8 @@ async def execute_pipeline(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         # Possible errors: Invalid features, calculation errors
         raise HTTPException(status_code=500, detail=f"Pipeline execution error: {str(e)}")
@@ -113,6 +126,7 @@ async def execute_explicit_pipeline(
         scenario_id = request_data.get('scenario_id')
         building_id = request_data.get('building_id')
         input_data = request_data.get('input_data')
+        check_input_data(input_data)
         
         if not execution_plan:
             return {"error": "Missing execution_plan"}
@@ -136,6 +150,8 @@ async def execute_explicit_pipeline(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         # Possible errors: Invalid execution plan, method not found
         raise HTTPException(status_code=500, detail=f"Pipeline execution error: {str(e)}")
@@ -161,6 +177,7 @@ async def execute_predefined_pipeline(
         scenario_id = request_data.get('scenario_id')
         building_id = request_data.get('building_id')
         input_data = request_data.get('input_data', {})
+        check_input_data(input_data)
         
         if not pipeline_name:
             return {"error": "Missing pipeline_name"}
@@ -181,6 +198,8 @@ async def execute_predefined_pipeline(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         # Possible errors: Pipeline not found, execution errors
         raise HTTPException(status_code=500, detail=f"Pipeline execution error: {str(e)}")
@@ -208,6 +227,7 @@ async def calculate_feature(
         scenario_id = request_data.get('scenario_id')
         building_id = request_data.get('building_id')
         input_data = request_data.get('input_data')
+        check_input_data(input_data)
         
         if not feature_name:
             return {"error": "Missing feature_name"}
@@ -253,6 +273,8 @@ async def calculate_feature(
                 "error": error
             }
             
+    except HTTPException:
+        raise
     except Exception as e:
         # Possible errors: Feature not found, calculation errors
         raise HTTPException(status_code=500, detail=f"Feature calculation error: {str(e)}")
@@ -352,6 +374,10 @@ async def load_scenario_geo(
 ):
     """Load scenario geometry data"""
     try:
+        error = boundary_feature_error(scenario_geo)
+        if error:
+            raise HTTPException(status_code=400, detail=f"Invalid scenario_geo: {error}")
+        
         # Get executor and data manager with DB session
         executor, data_manager = get_pipeline_executor(db)
         
@@ -371,6 +397,8 @@ async def load_scenario_geo(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         # Possible errors: Invalid geometry, pipeline execution errors
         raise HTTPException(status_code=500, detail=f"Data loading error: {str(e)}")
@@ -385,6 +413,17 @@ async def load_building_geo(
 ):
     """Load building geometry data"""
     try:
+        buildings = building_geo.get('buildings', [])
+        if not isinstance(buildings, list):
+            raise HTTPException(status_code=400, detail="Invalid building_geo: buildings must be an array")
+        for idx, building in enumerate(buildings):
+            if not isinstance(building, dict):
+                raise HTTPException(status_code=400, detail=f"Invalid building_geo: building {idx} must be an object")
+            if 'geometry' in building:
+                error = geometry_error(building['geometry'])
+                if error:
+                    raise HTTPException(status_code=400, detail=f"Invalid building_geo: building {idx} {error}")
+        
         # Get executor and data manager with DB session
         executor, data_manager = get_pipeline_executor(db)
         
@@ -404,6 +443,8 @@ async def load_building_geo(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         # Possible errors: Invalid geometry, pipeline execution errors
         raise HTTPException(status_code=500, detail=f"Data loading error: {str(e)}")
@@ -642,6 +683,10 @@ async def execute_sansa_complete_chain(
             # Assume it's already a Feature
             scenario_geo_input = project_boundary
         
+        error = boundary_feature_error(scenario_geo_input)
+        if error:
+            raise HTTPException(status_code=400, detail=f"Invalid project_boundary: {error}")
+        
         # Set the scenario_geo as input data
         data_manager.set_feature('scenario_geo', scenario_geo_input)
         data_manager.set_feature('project_boundary', project_boundary)
@@ -819,29 +864,31 @@ async def execute_sansa_complete_chain(
             features = building_geo.get('features', [])
             summary["total_buildings"] = len(features)
         
-        if building_heights and isinstance(building_heights, (list, dict)):
-            if isinstance(building_heights, list):
-                summary["average_height_m"] = sum(building_heights) / len(building_heights) if building_heights else 0
-                summary["max_height_m"] = max(building_heights) if building_heights else 0
-                summary["min_height_m"] = min(building_heights) if building_heights else 0
-        
-        if building_areas and isinstance(building_areas, (list, dict)):
-            if isinstance(building_areas, list):
-                summary["total_area_m2"] = sum(building_areas)
-                summary["average_area_m2"] = sum(building_areas) / len(building_areas) if building_areas else 0
-        
-        if building_volumes and isinstance(building_volumes, (list, dict)):
-            if isinstance(building_volumes, list):
-                summary["total_volume_m3"] = sum(building_volumes)
-                summary["average_volume_m3"] = sum(building_volumes) / len(building_volumes) if building_volumes else 0
-        
-        if census_population:
+        # Per-building features are either a list of numbers or a dict summary
+        # (default data from calculators); only lists are aggregated
+        if isinstance(building_heights, list) and building_heights:
+            avg_height, max_height, min_height, _ = compute_list_statistics(building_heights)
+            summary["average_height_m"] = avg_height
+            summary["max_height_m"] = max_height
+            summary["min_height_m"] = min_height
+        
+        if isinstance(building_areas, list) and building_areas:
+            total_area = sum(building_areas)
+            summary["total_area_m2"] = total_area
+            summary["average_area_m2"] = total_area / len(building_areas)
+        
+        if isinstance(building_volumes, list) and building_volumes:
+            total_volume = sum(building_volumes)
+            summary["total_volume_m3"] = total_volume
+            summary["average_volume_m3"] = total_volume / len(building_volumes)
+        
+        if census_population is not None:
             summary["total_census_population"] = census_population
         
-        if building_populations and isinstance(building_populations, (list, dict)):
-            if isinstance(building_populations, list):
-                summary["total_distributed_population"] = sum(building_populations)
-                summary["average_population_per_building"] = sum(building_populations) / len(building_populations) if building_populations else 0
+        if isinstance(building_populations, list) and building_populations:
+            total_population = sum(building_populations)
+            summary["total_distributed_population"] = total_population
+            summary["average_population_per_building"] = total_population / len(building_populations)
         
         execution_results["summary"] = summary
         
@@ -3,18 +3,44 @@ Raster Routes - Direct database access to raster data
 FastAPI implementation for CIM Wizard Integrated
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request
+from fastapi.responses import StreamingResponse, Response
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable
 import json
+import orjson
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 from app.db.database import get_db
 from app.services.raster_service import RasterService
+from app.core.geojson_validation import geometry_error
 # Removed Pydantic schemas for simplicity - using dict responses
 
 
 router = APIRouter()
 
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+HEIGHT_RESULT_STRING_COLUMNS = ("building_id", "status", "error")
+HEIGHT_RESULT_FLOAT_COLUMNS = ("dtm_avg_height", "dsm_avg_height", "building_height")
+
+
+def stream_results_json(results: Iterable[Dict[str, Any]],
+                        summary: Callable[[int], Dict[str, Any]]) -> Iterator[bytes]:
+    """Yield {"results": [...], **summary} as JSON bytes, one result at a time"""
+    yield b'{"results":['
+    total = 0
+    for result in results:
+        if total:
+            yield b','
+        yield orjson.dumps(result, default=str)
+        total += 1
+    # Summary keys are appended after the list: drop the opening brace of the dumped dict
+    yield b'],' + orjson.dumps(summary(total), default=str)[1:]
+
 
 @router.post("/height")
 async def calculate_building_height(
@@ -25,6 +51,10 @@ async def calculate_building_height(
 ):
     """Calculate building height from DTM and DSM rasters"""
     try:
+        error = geometry_error(building_geometry)
+        if error:
+            raise HTTPException(status_code=400, detail=f"Invalid building_geometry: {error}")
+        
         raster_service = RasterService(db_session=db)
         
         result = raster_service.calculate_building_height(
@@ -35,26 +65,78 @@ async def calculate_building_height(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         # Possible errors: Invalid geometry, raster data not available
         raise HTTPException(status_code=500, detail=f"Height calculation error: {str(e)}")
 
 
+def height_results_arrow(results: List[Dict[str, Any]], total: int, successful: int) -> bytes:
+    """Serialize height results as an Arrow IPC stream (one column per result field, summary in the schema metadata)"""
+    # Fixed column types: building ids may mix integers and strings across a batch
+    schema = pa.schema(
+        [pa.field("building_id", pa.string())]
+        + [pa.field(column, pa.float64()) for column in HEIGHT_RESULT_FLOAT_COLUMNS]
+        + [pa.field("status", pa.string()), pa.field("error", pa.string())],
+        metadata={"total": str(total), "successful": str(successful)}
+    )
+    columns = {
+        column: [None if result.get(column) is None else str(result[column]) for result in results]
+        for column in HEIGHT_RESULT_STRING_COLUMNS
+    }
+    columns.update({
+        column: [None if result.get(column) is None else float(result[column]) for result in results]
+        for column in HEIGHT_RESULT_FLOAT_COLUMNS
+    })
+    table = pa.table(columns, schema=schema)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
 @router.post("/height_batch")
 async def calculate_building_heights_batch(
+    request: Request,
     features: List[Dict[str, Any]] = Body(..., description="GeoJSON features with building geometries"),
+    stream: bool = Query(False, description="Stream results as they are calculated"),
     db: Session = Depends(get_db)
 ):
-    """Calculate heights for multiple buildings"""
+    """Calculate heights for multiple buildings (Arrow IPC stream if requested via Accept)"""
     try:
+        if stream:
+            # The request session is closed before the body is sent, so the
+            # streaming service owns its session for the lifetime of the generator
+            raster_service = RasterService()
+            counts = {"successful": 0}
+            
+            def counted_results():
+                for result in raster_service.iter_building_heights(features):
+                    if result.get("status") == "calculated":
+                        counts["successful"] += 1
+                    yield result
+            
+            return StreamingResponse(
+                stream_results_json(
+                    counted_results(),
+                    lambda total: {"total": total, "successful": counts["successful"]}
+                ),
+                media_type="application/json"
+            )
+        
         raster_service = RasterService(db_session=db)
         
         results = raster_service.calculate_building_heights_batch(features)
+        successful = len([r for r in results if r.get("status") == "calculated"])
+        
+        if PYARROW_AVAILABLE and ARROW_STREAM_MEDIA_TYPE in request.headers.get("accept", ""):
+            return Response(height_results_arrow(results, len(results), successful), media_type=ARROW_STREAM_MEDIA_TYPE)
         
         return {
             "results": results,
             "total": len(results),
-            "successful": len([r for r in results if r.get("status") == "calculated"])
+            "successful": successful
         }
         
     except Exception as e:
@@ -98,6 +180,10 @@ async def clip_dtm_raster(
 ):
     """Clip DTM raster to a polygon"""
     try:
+        error = geometry_error(polygon)
+        if error:
+            raise HTTPException(status_code=400, detail=f"Invalid polygon: {error}")
+        
         raster_service = RasterService(db_session=db)
         
         clipped_raster = raster_service.clip_raster(
@@ -124,6 +210,10 @@ async def clip_dsm_raster(
 ):
     """Clip DSM raster to a polygon"""
     try:
+        error = geometry_error(polygon)
+        if error:
+            raise HTTPException(status_code=400, detail=f"Invalid polygon: {error}")
+        
         raster_service = RasterService(db_session=db)
         
         clipped_raster = raster_service.clip_raster(
@@ -190,6 +280,10 @@ async def get_raster_statistics(
 ):
     """Get raster statistics within a polygon"""
     try:
+        error = geometry_error(polygon)
+        if error:
+            raise HTTPException(status_code=400, detail=f"Invalid polygon: {error}")
+        
         raster_service = RasterService(db_session=db)
         
         statistics = raster_service.get_raster_statistics(
@@ -199,62 +293,79 @@ async def get_raster_statistics(
         
         return statistics
         
+    except HTTPException:
+        raise
     except Exception as e:
         # Possible errors: Invalid polygon, database issues
         raise HTTPException(status_code=500, detail=f"Statistics calculation error: {str(e)}")
 
 
+def iter_fast_heights(raster_service: RasterService, features: List[Dict[str, Any]],
+                      use_cache: bool, counts: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+    """Yield cached or freshly calculated heights, tallying sources in counts"""
+    for feature in features:
+        building_id = feature.get("properties", {}).get("building_id")
+        geometry = feature.get("geometry")
+        
+        if not geometry:
+            yield {
+                "building_id": building_id,
+                "status": "error",
+                "error": "Missing geometry"
+            }
+            continue
+        
+        # Try cache first if building_id available
+        if use_cache and building_id:
+            cached = raster_service.get_cached_height(building_id)
+            if cached:
+                counts["cached"] += 1
+                yield cached
+                continue
+        
+        # Calculate if not cached
+        height_data = raster_service.calculate_building_height(
+            building_geometry=geometry,
+            building_id=building_id,
+            use_cache=False  # Already checked cache
+        )
+        if height_data.get("status") == "calculated":
+            counts["calculated"] += 1
+        yield height_data
+
+
 @router.post("/height_fast")
 async def calculate_building_heights_fast(
     features: List[Dict[str, Any]] = Body(..., description="GeoJSON features with building geometries"),
     use_cache: bool = Body(True, description="Use cached values where available"),
+    stream: bool = Query(False, description="Stream results as they are calculated"),
     db: Session = Depends(get_db)
 ):
     """Fast batch height calculation with caching"""
     try:
-        raster_service = RasterService(db_session=db)
+        counts = {"cached": 0, "calculated": 0}
         
-        results = []
-        cached_count = 0
-        calculated_count = 0
+        def summary(total):
+            return {
+                "total": total,
+                "cached": counts["cached"],
+                "calculated": counts["calculated"],
+                "errors": total - counts["cached"] - counts["calculated"]
+            }
         
-        for feature in features:
-            building_id = feature.get("properties", {}).get("building_id")
-            geometry = feature.get("geometry")
-            
-            if not geometry:
-                results.append({
-                    "building_id": building_id,
-                    "status": "error",
-                    "error": "Missing geometry"
-                })
-                continue
-            
-            # Try cache first if building_id available
-            if use_cache and building_id:
-                cached = raster_service.get_cached_height(building_id)
-                if cached:
-                    results.append(cached)
-                    cached_count += 1
-                    continue
-            
-            # Calculate if not cached
-            height_data = raster_service.calculate_building_height(
-                building_geometry=geometry,
-                building_id=building_id,
-                use_cache=False  # Already checked cache
+        if stream:
+            # Streaming service owns its session (see /height_batch)
+            raster_service = RasterService()
+            return StreamingResponse(
+                stream_results_json(iter_fast_heights(raster_service, features, use_cache, counts), summary),
+                media_type="application/json"
             )
-            results.append(height_data)
-            if height_data.get("status") == "calculated":
-                calculated_count += 1
         
-        return {
-            "results": results,
-            "total": len(results),
-            "cached": cached_count,
-            "calculated": calculated_count,
-            "errors": len(results) - cached_count - calculated_count
-        }
+        raster_service = RasterService(db_session=db)
+        
+        results = list(iter_fast_heights(raster_service, features, use_cache, counts))
+        
+        return {"results": results, **summary(len(results))}
         
     except Exception as e:
         # Possible errors: Database issues
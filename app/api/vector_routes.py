@@ -4,14 +4,16 @@ FastAPI implementation for CIM Wizard Integrated
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, text, cast
 from typing import List, Optional, Dict, Any
-from geoalchemy2.shape import to_shape
-from shapely.geometry import mapping
 import json
+import math
+import orjson
 
-from app.db.database import get_db
+from app.db.database import get_db, SessionLocal
+from app.core import response_cache
 from app.models.vector import (
     ProjectScenario, Building, BuildingProperties, 
     GridBus, GridLine
@@ -19,182 +21,264 @@ from app.models.vector import (
 # Removed Pydantic schemas for simplicity - using dict responses
 
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+
+def geojson_fragment(geometry_json: Optional[str]):
+    """Embed a PostGIS ST_AsGeoJSON string into an orjson response without re-parsing"""
+    return orjson.Fragment(geometry_json) if geometry_json is not None else None
+
+
+# Labels of ST_AsGeoJSON columns that are embedded without re-parsing
+GEOJSON_COLUMN_LABELS = ('geometry', 'project_boundary', 'project_center', 'census_boundary')
+
+
+def rows_to_dicts(rows) -> List[Dict[str, Any]]:
+    """Convert column-projected rows to dicts, embedding ST_AsGeoJSON geometries as-is"""
+    records = []
+    for row in rows:
+        record = dict(row._mapping)
+        for label in GEOJSON_COLUMN_LABELS:
+            if label in record:
+                record[label] = geojson_fragment(record[label])
+        records.append(record)
+    return records
+
+
+# Columns rendered by the list endpoints (full ORM entities are never needed there)
+PROJECT_LIST_COLUMNS = (
+    ProjectScenario.project_id,
+    ProjectScenario.scenario_id,
+    ProjectScenario.project_name,
+    ProjectScenario.scenario_name,
+    ProjectScenario.project_zoom,
+    ProjectScenario.project_crs,
+    ProjectScenario.created_at,
+    ProjectScenario.updated_at
+)
+
+PROJECT_DETAIL_COLUMNS = PROJECT_LIST_COLUMNS + (
+    func.ST_AsGeoJSON(ProjectScenario.project_boundary).label('project_boundary'),
+    func.ST_AsGeoJSON(ProjectScenario.project_center).label('project_center'),
+    func.ST_AsGeoJSON(ProjectScenario.census_boundary).label('census_boundary'),
+    ProjectScenario.cosimulator_config_mongo_path,
+    ProjectScenario.network_mongo_path,
+    ProjectScenario.results_mongo_path
+)
+
+BUILDING_PROPERTIES_LIST_COLUMNS = (
+    BuildingProperties.building_id,
+    BuildingProperties.lod,
+    BuildingProperties.project_id,
+    BuildingProperties.scenario_id,
+    BuildingProperties.height,
+    BuildingProperties.area,
+    BuildingProperties.volume,
+    BuildingProperties.number_of_floors,
+    BuildingProperties.filter_res,
+    BuildingProperties.const_period_census,
+    BuildingProperties.const_year,
+    BuildingProperties.const_TABULA,
+    BuildingProperties.n_people,
+    BuildingProperties.n_family
+)
+
+GRID_LINE_LIST_COLUMNS = (
+    GridLine.id,
+    GridLine.network_id,
+    GridLine.line_id,
+    GridLine.project_id,
+    GridLine.scenario_id,
+    func.ST_AsGeoJSON(GridLine.geometry).label('geometry'),
+    GridLine.name,
+    GridLine.from_bus,
+    GridLine.to_bus,
+    GridLine.length_km,
+    GridLine.max_loading_percent
+)
 
 
 @router.get("/projects")
-async def get_all_projects(
+def get_all_projects(
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
     db: Session = Depends(get_db)
 ):
     """Get all projects with pagination"""
-    try:
-        projects = db.query(ProjectScenario).offset(offset).limit(limit).all()
-        return projects
-    except Exception as e:
-        # Possible errors: Database connection issues
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    def build():
+        projects = db.query(*PROJECT_LIST_COLUMNS).offset(offset).limit(limit).all()
+        return orjson.dumps(rows_to_dicts(projects))
+    
+    body = response_cache.get_or_build(("projects", "list", limit, offset), build)
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/dashboard")
-async def project_dashboard(db: Session = Depends(get_db)):
+def project_dashboard(db: Session = Depends(get_db)):
     """Get project dashboard with summary statistics"""
-    try:
+    def build():
         total_projects = db.query(ProjectScenario).count()
-        projects = db.query(ProjectScenario).limit(10).all()
-        
-        return {
+        projects = db.query(*PROJECT_LIST_COLUMNS).limit(10).all()
+        return orjson.dumps({
             "total_projects": total_projects,
-            "projects": projects
-        }
-    except Exception as e:
-        # Possible errors: Database connection issues
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+            "projects": rows_to_dicts(projects)
+        })
+    
+    body = response_cache.get_or_build(("projects", "dashboard"), build)
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/pscenarios/{project_id}")
-async def get_project_scenarios(
+def get_project_scenarios(
     project_id: str,
     db: Session = Depends(get_db)
 ):
     """Get all scenarios for a specific project"""
-    try:
-        scenarios = db.query(ProjectScenario).filter(
-            ProjectScenario.project_id == project_id
-        ).all()
-        
-        if not scenarios:
-            raise HTTPException(status_code=404, detail="Project not found")
-        
-        return scenarios
-    except HTTPException:
-        raise
-    except Exception as e:
-        # Possible errors: Database connection issues
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    scenarios = db.query(*PROJECT_DETAIL_COLUMNS).filter(
+        ProjectScenario.project_id == project_id
+    ).all()
+    
+    if not scenarios:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    # Rows are already shaped by the query, skip ORM-to-JSON encoding
+    return ORJSONResponse(content=rows_to_dicts(scenarios))
 
 
 @router.get("/project_scenario_details/{project_id}/{scenario_id}")
-async def get_project_scenario_details(
+def get_project_scenario_details(
     project_id: str,
     scenario_id: str,
     db: Session = Depends(get_db)
 ):
     """Get details for a specific project scenario"""
-    try:
-        scenario = db.query(ProjectScenario).filter(
-            and_(
-                ProjectScenario.project_id == project_id,
-                ProjectScenario.scenario_id == scenario_id
-            )
-        ).first()
-        
-        if not scenario:
-            raise HTTPException(status_code=404, detail="Project scenario not found")
-        
-        return scenario
-    except HTTPException:
-        raise
-    except Exception as e:
-        # Possible errors: Database connection issues
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    scenario = db.query(*PROJECT_DETAIL_COLUMNS).filter(
+        and_(
+            ProjectScenario.project_id == project_id,
+            ProjectScenario.scenario_id == scenario_id
+        )
+    ).first()
+    
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Project scenario not found")
+    
+    return ORJSONResponse(content=rows_to_dicts([scenario])[0])
 
 
 @router.get("/bgeo/{building_id}")
-async def get_building_geometry(
+def get_building_geometry(
     building_id: str,
     lod: Optional[int] = Query(0),
     db: Session = Depends(get_db)
 ):
     """Get building geometry by building ID"""
+    building = db.query(
+        Building.building_id,
+        Building.lod,
+        Building.building_geometry_source,
+        Building.census_id,
+        func.ST_AsGeoJSON(Building.building_geometry).label('geometry_json')
+    ).filter(
+        and_(
+            Building.building_id == building_id,
+            Building.lod == lod
+        )
+    ).first()
+    
+    if not building:
+        raise HTTPException(status_code=404, detail="Building not found")
+    
+    # Geometry is serialized to GeoJSON by PostGIS and embedded as-is
+    return ORJSONResponse(content={
+        "building_id": building.building_id,
+        "lod": building.lod,
+        "geometry": geojson_fragment(building.geometry_json),
+        "geometry_source": building.building_geometry_source,
+        "census_id": building.census_id
+    })
+
+
+# GeoJSON Feature for one building_properties row (p) joined with its building (b)
+BUILDING_FEATURE_SQL = """
+    json_build_object(
+        'type', 'Feature',
+        'geometry', ST_AsGeoJSON(b.building_geometry)::json,
+        'properties', json_build_object(
+            'building_id', b.building_id,
+            'lod', b.lod,
+            'height', p.height,
+            'area', p.area,
+            'volume', p.volume,
+            'filter_res', p.filter_res,
+            'n_people', p.n_people,
+            'n_family', p.n_family
+        )
+    )
+"""
+
+BUILDINGS_FROM_SQL = """
+    FROM cim_vector.building_properties p
+    JOIN cim_vector.building b
+        ON b.building_id = p.building_id AND b.lod = p.lod
+    WHERE p.project_id = :project_id
+        AND p.scenario_id = :scenario_id
+        AND p.lod = :lod
+"""
+
+GEOJSON_STREAM_BATCH_SIZE = 1000
+
+
+def stream_buildings_geojson(params: Dict[str, Any]):
+    """Yield a FeatureCollection in batches of features read from a server-side cursor"""
+    # The request session is closed before the body is sent, so the stream owns its session
+    db = SessionLocal()
     try:
-        building = db.query(Building).filter(
-            and_(
-                Building.building_id == building_id,
-                Building.lod == lod
-            )
-        ).first()
-        
-        if not building:
-            raise HTTPException(status_code=404, detail="Building not found")
-        
-        # Convert geometry to GeoJSON
-        geom_shape = to_shape(building.building_geometry)
-        geometry = mapping(geom_shape)
+        result = db.execute(
+            text(f"SELECT ({BUILDING_FEATURE_SQL})::text {BUILDINGS_FROM_SQL}"),
+            params,
+            execution_options={"yield_per": GEOJSON_STREAM_BATCH_SIZE}
+        )
         
-        return {
-            "building_id": building.building_id,
-            "lod": building.lod,
-            "geometry": geometry,
-            "geometry_source": building.building_geometry_source,
-            "census_id": building.census_id
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
-        # Possible errors: Geometry conversion issues, database issues
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        yield b'{"type":"FeatureCollection","features":['
+        separator = b''
+        for partition in result.partitions():
+            yield separator + b','.join(feature.encode() for (feature,) in partition)
+            separator = b','
+        yield b']}'
+    finally:
+        db.close()
 
 
 @router.get("/get_buildings_geojson/{project_id}/{scenario_id}")
-async def get_buildings_geojson(
+def get_buildings_geojson(
     project_id: str,
     scenario_id: str,
     lod: Optional[int] = Query(0),
+    stream: bool = Query(False, description="Stream features instead of building the collection at once"),
     db: Session = Depends(get_db)
 ):
     """Get all buildings for a project scenario as GeoJSON"""
-    try:
-        # Get building properties with buildings
-        query = db.query(BuildingProperties, Building).join(
-            Building,
-            and_(
-                Building.building_id == BuildingProperties.building_id,
-                Building.lod == BuildingProperties.lod
-            )
-        ).filter(
-            and_(
-                BuildingProperties.project_id == project_id,
-                BuildingProperties.scenario_id == scenario_id,
-                BuildingProperties.lod == lod
-            )
-        )
-        
-        features = []
-        for props, building in query:
-            # Convert geometry to GeoJSON
-            geom_shape = to_shape(building.building_geometry)
-            geometry = mapping(geom_shape)
-            
-            # Create feature
-            feature = {
-                "type": "Feature",
-                "geometry": geometry,
-                "properties": {
-                    "building_id": building.building_id,
-                    "lod": building.lod,
-                    "height": props.height,
-                    "area": props.area,
-                    "volume": props.volume,
-                    "filter_res": props.filter_res,
-                    "n_people": props.n_people,
-                    "n_family": props.n_family
-                }
-            }
-            features.append(feature)
-        
-        return {
-            "type": "FeatureCollection",
-            "features": features
-        }
-    except Exception as e:
-        # Possible errors: Geometry conversion issues, database issues
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    params = {"project_id": project_id, "scenario_id": scenario_id, "lod": lod}
+    
+    if stream:
+        return StreamingResponse(stream_buildings_geojson(params), media_type="application/json")
+    
+    # Build the whole FeatureCollection in PostgreSQL and return its text as-is
+    feature_collection_query = text(f"""
+        SELECT json_build_object(
+            'type', 'FeatureCollection',
+            'features', COALESCE(json_agg({BUILDING_FEATURE_SQL}), '[]'::json)
+        )::text
+        {BUILDINGS_FROM_SQL}
+    """)
+    
+    feature_collection = db.execute(feature_collection_query, params).scalar()
+    
+    return Response(content=feature_collection, media_type="application/json")
 
 
 @router.get("/buildingproperties/{project_id}/{scenario_id}")
-async def query_building_properties(
+def query_building_properties(
     project_id: str,
     scenario_id: str,
     building_id: Optional[str] = Query(None),
@@ -204,97 +288,93 @@ async def query_building_properties(
     db: Session = Depends(get_db)
 ):
     """Query building properties for a project scenario"""
-    try:
-        query = db.query(BuildingProperties).filter(
-            and_(
-                BuildingProperties.project_id == project_id,
-                BuildingProperties.scenario_id == scenario_id,
-                BuildingProperties.lod == lod
-            )
+    query = db.query(*BUILDING_PROPERTIES_LIST_COLUMNS).filter(
+        and_(
+            BuildingProperties.project_id == project_id,
+            BuildingProperties.scenario_id == scenario_id,
+            BuildingProperties.lod == lod
         )
-        
-        if building_id:
-            query = query.filter(BuildingProperties.building_id == building_id)
-        
-        properties = query.offset(offset).limit(limit).all()
-        return properties
-    except Exception as e:
-        # Possible errors: Database connection issues
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    )
+    
+    if building_id:
+        query = query.filter(BuildingProperties.building_id == building_id)
+    
+    properties = query.offset(offset).limit(limit).all()
+    return ORJSONResponse(content=rows_to_dicts(properties))
 
 
 @router.get("/building_id_fetcher")
-async def building_id_fetcher(
+def building_id_fetcher(
     lat: float = Query(..., description="Latitude"),
     lng: float = Query(..., description="Longitude"),
     db: Session = Depends(get_db)
 ):
     """Fetch building IDs at a specific point"""
-    try:
-        # Create point from coordinates
-        from geoalchemy2 import func
-        point = func.ST_SetSRID(func.ST_MakePoint(lng, lat), 4326)
-        
-        # Query buildings that contain the point
-        buildings = db.query(Building).filter(
-            func.ST_Contains(Building.building_geometry, point)
-        ).all()
-        
-        return {
-            "buildings": [
-                {
-                    "building_id": b.building_id,
-                    "lod": b.lod,
-                    "census_id": b.census_id
-                }
-                for b in buildings
-            ]
-        }
-    except Exception as e:
-        # Possible errors: Invalid coordinates, database issues
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    # Create point from coordinates
+    from geoalchemy2 import func
+    point = func.ST_SetSRID(func.ST_MakePoint(lng, lat), 4326)
+    
+    # Query buildings that contain the point
+    buildings = db.query(Building).filter(
+        func.ST_Contains(Building.building_geometry, point)
+    ).all()
+    
+    return {
+        "buildings": [
+            {
+                "building_id": b.building_id,
+                "lod": b.lod,
+                "census_id": b.census_id
+            }
+            for b in buildings
+        ]
+    }
 
 
 @router.get("/building_id_fetcher_buffer")
-async def building_id_fetcher_buffer(
+def building_id_fetcher_buffer(
     lat: float = Query(..., description="Latitude"),
     lng: float = Query(..., description="Longitude"),
     buffer_m: float = Query(10, description="Buffer in meters"),
     db: Session = Depends(get_db)
 ):
     """Fetch building IDs within a buffer of a point"""
-    try:
-        from geoalchemy2 import func
-        # Create point from coordinates
-        point = func.ST_SetSRID(func.ST_MakePoint(lng, lat), 4326)
-        
-        # Convert buffer from meters to degrees (approximate)
-        buffer_deg = buffer_m / 111320.0  # 1 degree ≈ 111.32 km at equator
-        
-        # Query buildings within buffer distance
-        buildings = db.query(Building).filter(
-            func.ST_DWithin(Building.building_geometry, point, buffer_deg)
-        ).all()
-        
-        return {
-            "buildings": [
-                {
-                    "building_id": b.building_id,
-                    "lod": b.lod,
-                    "census_id": b.census_id
-                }
-                for b in buildings
-            ],
-            "buffer_m": buffer_m
-        }
-    except Exception as e:
-        # Possible errors: Invalid coordinates, database issues
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    from geoalchemy2 import func, Geography
+    # Create point from coordinates
+    point = func.ST_SetSRID(func.ST_MakePoint(lng, lat), 4326)
+    
+    # Conservative buffer in degrees for the GiST-indexed geometry prefilter:
+    # a degree of longitude shrinks with latitude, so take the larger of both spans
+    lon_scale = max(math.cos(math.radians(lat)), 1e-6)
+    buffer_deg = max(buffer_m / 110574.0, buffer_m / (111320.0 * lon_scale))
+    
+    # Query buildings within buffer distance: the geometry ST_DWithin uses the spatial
+    # index, the geography ST_DWithin then checks the exact distance in meters
+    buildings = db.query(Building).filter(
+        func.ST_DWithin(Building.building_geometry, point, buffer_deg),
+        func.ST_DWithin(
+            cast(Building.building_geometry, Geography),
+            cast(point, Geography),
+            buffer_m
+        )
+    ).all()
+    
+    return {
+        "buildings": [
+            {
+                "building_id": b.building_id,
+                "lod": b.lod,
+                "census_id": b.census_id
+            }
+            for b in buildings
+        ],
+        "buffer_m": buffer_m
+    }
 
 
 # Grid-related endpoints
 @router.get("/{project_id}/{scenario_id}/gridline")
-async def get_grid_lines(
+def get_grid_lines(
     project_id: str,
     scenario_id: str,
     network_id: Optional[str] = Query(None),
@@ -303,41 +383,33 @@ async def get_grid_lines(
     db: Session = Depends(get_db)
 ):
     """Get grid lines for a project scenario"""
-    try:
-        query = db.query(GridLine).filter(
-            and_(
-                GridLine.project_id == project_id,
-                GridLine.scenario_id == scenario_id
-            )
+    query = db.query(*GRID_LINE_LIST_COLUMNS).filter(
+        and_(
+            GridLine.project_id == project_id,
+            GridLine.scenario_id == scenario_id
         )
-        
-        if network_id:
-            query = query.filter(GridLine.network_id == network_id)
-        
-        lines = query.offset(offset).limit(limit).all()
-        return lines
-    except Exception as e:
-        # Possible errors: Database connection issues
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    )
+    
+    if network_id:
+        query = query.filter(GridLine.network_id == network_id)
+    
+    lines = query.offset(offset).limit(limit).all()
+    return ORJSONResponse(content=rows_to_dicts(lines))
 
 
 @router.get("/gridline/network/{network_id}")
-async def get_grid_lines_by_network(
+def get_grid_lines_by_network(
     network_id: str,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
     db: Session = Depends(get_db)
 ):
     """Get grid lines by network ID"""
-    try:
-        lines = db.query(GridLine).filter(
-            GridLine.network_id == network_id
-        ).offset(offset).limit(limit).all()
-        
-        return lines
-    except Exception as e:
-        # Possible errors: Database connection issues
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    lines = db.query(*GRID_LINE_LIST_COLUMNS).filter(
+        GridLine.network_id == network_id
+    ).offset(offset).limit(limit).all()
+    
+    return ORJSONResponse(content=rows_to_dicts(lines))
 
 
 @router.get("/health")
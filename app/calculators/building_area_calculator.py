@@ -1,7 +1,62 @@
 """
 Building Area Calculator
 """
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, List
+import numpy as np
+
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def shoelace_ring_areas(xs, ys, starts, lengths):
+    """Unsigned shoelace area per ring of flattened, projected ring coordinates"""
+    # Shift each ring to its first vertex to keep precision at UTM magnitudes
+    xs = xs - np.repeat(xs[starts], lengths)
+    ys = ys - np.repeat(ys[starts], lengths)
+    
+    # Each vertex pairs with the next one, wrapping to the ring start
+    next_index = np.arange(1, len(xs) + 1)
+    next_index[starts + lengths - 1] = starts
+    terms = xs * ys[next_index] - xs[next_index] * ys
+    return 0.5 * np.abs(np.add.reduceat(terms, starts))
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, parallel=True)
+    def shoelace_ring_areas_jit(xs, ys, starts, lengths):
+        """Compiled equivalent of shoelace_ring_areas, one ring per parallel iteration"""
+        out = np.empty(len(starts), dtype=np.float64)
+        for i in prange(len(starts)):
+            start = starts[i]
+            end = start + lengths[i]
+            x0 = xs[start]
+            y0 = ys[start]
+            s = 0.0
+            for j in range(start, end):
+                k = j + 1 if j + 1 < end else start
+                s += (xs[j] - x0) * (ys[k] - y0) - (xs[k] - x0) * (ys[j] - y0)
+            out[i] = 0.5 * abs(s)
+        return out
+
+
+# EPSG:4326 (lon/lat degrees) -> EPSG:32632 (UTM 32N for Northern Italy) as an explicit PROJ pipeline
+WGS84_TO_UTM32_PIPELINE = (
+    "+proj=pipeline "
+    "+step +proj=unitconvert +xy_in=deg +xy_out=rad "
+    "+step +proj=utm +zone=32 +ellps=WGS84"
+)
+
+
+@lru_cache(maxsize=1)
+def get_utm32_transformer():
+    """WGS84 -> UTM 32N transformer, built once from the pipeline string without CRS database lookups"""
+    import pyproj
+    return pyproj.Transformer.from_pipeline(WGS84_TO_UTM32_PIPELINE)
 
 
 class BuildingAreaCalculator:
@@ -42,6 +97,7 @@ class BuildingAreaCalculator:
             building_areas = []
             last_five_logs = []  # Track last 5 for summary
             
+            valid_buildings = []
             for idx, building in enumerate(buildings):
                 # Extract building_id and lod from properties (GeoJSON format)
                 properties = building.get('properties', {})
@@ -52,10 +108,12 @@ class BuildingAreaCalculator:
                     self.pipeline.log_error(self.calculator_name, f"Building at index {idx} has no building_id - this should have been set by building_geo_calculator")
                     continue  # Skip buildings without IDs instead of generating new ones
                 
-                # Calculate area from geometry using proper geographic projection (GeoJSON format)
-                geometry = building.get('geometry', {})
-                area = self._calculate_polygon_area(geometry)
-                
+                valid_buildings.append((building_id, lod, building.get('geometry', {})))
+            
+            # Calculate areas from geometry using proper geographic projection, all buildings at once
+            areas = self._calculate_polygon_areas([geometry for _, _, geometry in valid_buildings])
+            
+            for (building_id, lod, _), area in zip(valid_buildings, areas):
                 # Add to result list
                 building_properties_list.append({
                     'building_id': building_id,
@@ -107,60 +165,38 @@ class BuildingAreaCalculator:
             return None
     
     def _save_areas_to_database(self, db_session, building_props_list, project_id, scenario_id):
-        """Save calculated areas to database"""
+        """Save calculated areas to database with a single bulk upsert"""
         try:
             from app.models.vector import BuildingProperties
-            from sqlalchemy import and_
-            
-            updated_count = 0
-            created_count = 0
+            from sqlalchemy.dialects.postgresql import insert
             
+            # One row per composite key (a repeated building would make ON CONFLICT fail)
+            rows = {}
             for prop_data in building_props_list:
-                building_id = prop_data['building_id']
-                area = prop_data['area']
                 lod = prop_data.get('lod', 0)
-                
-                try:
-                    # Query with all composite key fields
-                    props = db_session.query(BuildingProperties).filter(
-                        and_(
-                            BuildingProperties.building_id == building_id,
-                            BuildingProperties.project_id == project_id,
-                            BuildingProperties.scenario_id == scenario_id,
-                            BuildingProperties.lod == lod
-                        )
-                    ).first()
-                    
-                    if props:
-                        if props.area != area:  # Only update if different
-                            props.area = area
-                            db_session.add(props)  # Mark as dirty
-                            updated_count += 1
-                    else:
-                        # Create new properties record
-                        new_props = BuildingProperties(
-                            building_id=building_id,
-                            project_id=project_id,
-                            scenario_id=scenario_id,
-                            lod=lod,
-                            area=area
-                        )
-                        db_session.add(new_props)
-                        created_count += 1
-                
-                except Exception as e:
-                    self.pipeline.log_warning(self.calculator_name, 
-                        f"Failed to save area for building {building_id}: {str(e)}")
-                    db_session.rollback()
-                    raise
+                rows[(prop_data['building_id'], lod)] = {
+                    'building_id': prop_data['building_id'],
+                    'project_id': project_id,
+                    'scenario_id': scenario_id,
+                    'lod': lod,
+                    'area': prop_data['area']
+                }
             
-            if updated_count > 0 or created_count > 0:
-                db_session.commit()
-                db_session.flush()  # Force write
-                self.pipeline.log_info(self.calculator_name, 
-                    f"Database commit complete: {updated_count} updated, {created_count} created")
-            else:
+            if not rows:
                 self.pipeline.log_warning(self.calculator_name, "No area changes to save")
+                return
+            
+            stmt = insert(BuildingProperties).values(list(rows.values()))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['building_id', 'lod', 'project_id', 'scenario_id'],
+                set_={'area': stmt.excluded.area},
+                # Only update if different
+                where=BuildingProperties.area.is_distinct_from(stmt.excluded.area)
+            )
+            result = db_session.execute(stmt)
+            db_session.commit()
+            self.pipeline.log_info(self.calculator_name, 
+                f"Database commit complete: {result.rowcount} of {len(rows)} areas created or updated")
             
         except Exception as e:
             db_session.rollback()
@@ -173,41 +209,76 @@ class BuildingAreaCalculator:
     
     def _calculate_polygon_area(self, geometry: Dict[str, Any]) -> float:
         """Calculate area of polygon geometry in square meters using proper geographic projection"""
-        if geometry.get('type') not in ['Polygon', 'MultiPolygon']:
-            return 0.0
+        return self._calculate_polygon_areas([geometry])[0]
+    
+    def _calculate_polygon_areas(self, geometries: List[Dict[str, Any]]) -> List[float]:
+        """Calculate areas in square meters for many polygon geometries with one UTM projection call"""
+        areas = [0.0] * len(geometries)
         
-        try:
-            from shapely.geometry import shape
-            import pyproj
-            from shapely.ops import transform
-            
-            # Create shapely geometry from GeoJSON
-            geom = shape(geometry)
-            
-            # Project to UTM zone 32N for Turin area (accurate area calculation)
-            project = pyproj.Transformer.from_crs(
-                pyproj.CRS('EPSG:4326'),  # WGS84
-                pyproj.CRS('EPSG:32632'),  # UTM 32N for Northern Italy
-                always_xy=True
-            ).transform
-            
-            # Transform geometry to UTM for accurate area calculation
-            geom_utm = transform(project, geom)
-            
-            # Calculate area in square meters
-            area = geom_utm.area
-            
-            # Only log once, not for every building
-            # self.pipeline.log_debug(self.calculator_name, f"Used UTM projection for accurate area calculation")
-            return area
+        # Flatten every ring into one coordinate array; holes subtract from their polygon
+        ring_coords = []
+        ring_geometry_index = []
+        ring_sign = []
+        fallback_indices = []
+        
+        for geometry_index, geometry in enumerate(geometries):
+            geometry_type = geometry.get('type')
+            if geometry_type not in ['Polygon', 'MultiPolygon']:
+                continue
             
-        except ImportError:
-            # Fallback to approximate calculation if shapely/pyproj not available
-            self.pipeline.log_warning(self.calculator_name, "Shapely/pyproj not available, using approximate area calculation")
-            return self._calculate_polygon_area_approximate(geometry)
-        except Exception as e:
-            self.pipeline.log_warning(self.calculator_name, f"Error in precise area calculation: {str(e)}, using fallback")
-            return self._calculate_polygon_area_approximate(geometry)
+            try:
+                polygons = geometry['coordinates'] if geometry_type == 'MultiPolygon' else [geometry['coordinates']]
+                for polygon in polygons:
+                    for ring_index, ring in enumerate(polygon):
+                        ring_array = np.asarray(ring, dtype=np.float64)
+                        if ring_array.ndim != 2 or ring_array.shape[1] < 2:
+                            raise ValueError("invalid ring coordinates")
+                        if len(ring_array) < 3:
+                            continue
+                        ring_coords.append(ring_array[:, :2])
+                        ring_geometry_index.append(geometry_index)
+                        ring_sign.append(1.0 if ring_index == 0 else -1.0)
+            except Exception as e:
+                self.pipeline.log_warning(self.calculator_name, f"Error in precise area calculation: {str(e)}, using fallback")
+                fallback_indices.append(geometry_index)
+        
+        if ring_coords:
+            try:
+                # Project to UTM zone 32N for Turin area (accurate area calculation)
+                transformer = get_utm32_transformer()
+                
+                lengths = np.fromiter((len(ring) for ring in ring_coords), dtype=np.int64, count=len(ring_coords))
+                starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+                coords = np.concatenate(ring_coords)
+                xs, ys = transformer.transform(coords[:, 0], coords[:, 1])
+                xs = np.ascontiguousarray(xs, dtype=np.float64)
+                ys = np.ascontiguousarray(ys, dtype=np.float64)
+                
+                if NUMBA_AVAILABLE:
+                    ring_areas = shoelace_ring_areas_jit(xs, ys, starts, lengths)
+                else:
+                    ring_areas = shoelace_ring_areas(xs, ys, starts, lengths)
+                
+                geometry_areas = np.bincount(
+                    np.asarray(ring_geometry_index),
+                    weights=ring_areas * np.asarray(ring_sign),
+                    minlength=len(geometries)
+                )
+                for ring_geometry in set(ring_geometry_index):
+                    areas[ring_geometry] = float(geometry_areas[ring_geometry])
+                
+            except ImportError:
+                # Fallback to approximate calculation if pyproj not available
+                self.pipeline.log_warning(self.calculator_name, "pyproj not available, using approximate area calculation")
+                fallback_indices.extend(set(ring_geometry_index))
+            except Exception as e:
+                self.pipeline.log_warning(self.calculator_name, f"Error in precise area calculation: {str(e)}, using fallback")
+                fallback_indices.extend(set(ring_geometry_index))
+        
+        for geometry_index in fallback_indices:
+            areas[geometry_index] = self._calculate_polygon_area_approximate(geometries[geometry_index])
+        
+        return areas
     
     def _calculate_polygon_area_approximate(self, geometry: Dict[str, Any]) -> float:
         """Approximate polygon area calculation for WGS84 coordinates"""
@@ -220,31 +291,23 @@ class BuildingAreaCalculator:
         
         # Conversion factors for Turin area (45°N latitude)
         # 1 degree longitude ≈ 78,700m, 1 degree latitude ≈ 111,000m at 45°N
-        lon_to_m = 78700
-        lat_to_m = 111000
+        lon_to_m = 78700.0
+        lat_to_m = 111000.0
         
-        # For MultiPolygon, sum areas of all polygons
+        # For MultiPolygon, sum areas of all polygons (outer rings only)
         if geometry.get('type') == 'MultiPolygon':
-            total_area = 0.0
-            for polygon_coords in coordinates:
-                area = 0.0
-                coords = polygon_coords[0]  # Outer ring
-                n = len(coords)
-                for i in range(n - 1):
-                    x1, y1 = coords[i][0] * lon_to_m, coords[i][1] * lat_to_m
-                    x2, y2 = coords[i + 1][0] * lon_to_m, coords[i + 1][1] * lat_to_m
-                    area += x1 * y2 - x2 * y1
-                total_area += abs(area) / 2.0
-            return total_area
-        
-        # For single Polygon
-        coords = coordinates[0]  # Outer ring
-        area = 0.0
-        n = len(coords)
+            outer_rings = [polygon_coords[0] for polygon_coords in coordinates if polygon_coords]
+        else:
+            outer_rings = [coordinates[0]]
         
-        for i in range(n - 1):
-            x1, y1 = coords[i][0] * lon_to_m, coords[i][1] * lat_to_m
-            x2, y2 = coords[i + 1][0] * lon_to_m, coords[i + 1][1] * lat_to_m
-            area += x1 * y2 - x2 * y1
+        total_area = 0.0
+        for coords in outer_rings:
+            ring = np.asarray(coords, dtype=np.float64)
+            if ring.ndim != 2 or len(ring) < 3:
+                continue
+            x = ring[:, 0] * lon_to_m
+            y = ring[:, 1] * lat_to_m
+            # Vectorized shoelace over consecutive vertex pairs
+            total_area += 0.5 * abs(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
         
-        return abs(area) / 2.0 
\ No newline at end of file
+        return float(total_area)
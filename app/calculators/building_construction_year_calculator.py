@@ -4,16 +4,46 @@ Building Construction Year Calculator - Distribute construction years from censu
 from typing import Optional, Dict, Any, Tuple
 import pandas as pd
 import geopandas as gpd
-import random
+import numpy as np
+
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def sample_slot_years_jit(slot_periods, period_lo, period_hi, tabula_upper_bounds, seed):
+        """Random year and TABULA period index per slot, fused into one compiled loop"""
+        np.random.seed(seed)
+        years = np.empty(len(slot_periods), dtype=np.int64)
+        tabula_codes = np.empty(len(slot_periods), dtype=np.int64)
+        for i in range(len(slot_periods)):
+            period = slot_periods[i]
+            year = np.random.randint(period_lo[period], period_hi[period] + 1)
+            # Same as np.searchsorted(tabula_upper_bounds, year) over the few TABULA bounds,
+            # with years after the last bound kept in the last period
+            code = 0
+            while code < len(tabula_upper_bounds) - 1 and year > tabula_upper_bounds[code]:
+                code += 1
+            years[i] = year
+            tabula_codes[i] = code
+        return years, tabula_codes
 
 
 class BuildingConstructionYearCalculator:
     """Calculate construction years based on census E8-E16 data"""
     
-    def __init__(self, pipeline_executor):
+    def __init__(self, pipeline_executor, seed: Optional[int] = None):
         self.pipeline = pipeline_executor
         self.calculator_name = self.__class__.__name__
         
+        # Random generator for period shuffling and year sampling (seed for reproducible runs)
+        self.rng = np.random.default_rng(seed)
+        
         # Construction year ranges for E8-E16
         self.construction_year_ranges = {
             'E8': (1800, 1918),   # Before 1919
@@ -27,6 +57,11 @@ class BuildingConstructionYearCalculator:
             'E16': (2006, 2023)   # After 2005
         }
         
+        # The same ranges as arrays in period order, indexed by period position (0 = E8)
+        self._period_keys = np.array(list(self.construction_year_ranges))
+        self._period_lo = np.array([low for low, _ in self.construction_year_ranges.values()], dtype=np.int32)
+        self._period_hi = np.array([high for _, high in self.construction_year_ranges.values()], dtype=np.int32)
+        
         # TABULA period ranges
         self.tabula_periods = [
             (0, 1900, "TABULA_1"),
@@ -37,14 +72,48 @@ class BuildingConstructionYearCalculator:
             (1976, 1990, "TABULA_6"),
             (1991, 2005, "TABULA_7")
         ]
+        
+        # Upper bounds for np.searchsorted lookups of TABULA period positions
+        self._tabula_upper_bounds = np.array([end for _, end, _ in self.tabula_periods])
+        
+        # Output label dtypes; values are written as integer codes into these categories
+        self._period_dtype = pd.CategoricalDtype(self._period_keys.tolist())
+        self._tabula_dtype = pd.CategoricalDtype([period for _, _, period in self.tabula_periods])
     
-    def _get_tabula_period(self, year):
-        """Get TABULA period string for a given year"""
-        for start, end, period in self.tabula_periods:
-            if start <= year <= end:
-                return period
-        # Default for years after 2005
-        return "TABULA_7"
+    def _get_tabula_codes(self, years):
+        """Get TABULA period positions for an array of years (years after 2005 default to TABULA_7)"""
+        return np.minimum(np.searchsorted(self._tabula_upper_bounds, years), len(self._tabula_upper_bounds) - 1)
+    
+    def _census_year_percentages(self, census_year_counts):
+        """Share of each construction period per zone (one row per zone)"""
+        totals = census_year_counts.sum(axis=1)
+        has_census = totals > 0
+        has_periods = census_year_counts > 0
+        
+        # Default to 1971-1980 period when no period has buildings
+        year_percentages = np.tile((self._period_keys == 'E12').astype(np.float64), (len(census_year_counts), 1))
+        
+        # No usable census total (e.g. missing counts): uniform over the periods that have buildings
+        uniform = ~has_census & has_periods.any(axis=1)
+        year_percentages[uniform] = has_periods[uniform] / has_periods[uniform].sum(axis=1, keepdims=True)
+        
+        year_percentages[has_census] = census_year_counts[has_census] / totals[has_census, None]
+        return year_percentages
+    
+    def _allocate_period_counts(self, year_percentages, residential_counts):
+        """Split each zone's residential buildings over periods with one multinomial draw per zone"""
+        period_counts = np.zeros(year_percentages.shape, dtype=np.int64)
+        
+        # Single-period zones (including the E12 default) take all their buildings without a draw
+        single_period = (year_percentages > 0).sum(axis=1) == 1
+        rows = np.flatnonzero(single_period)
+        period_counts[rows, year_percentages[rows].argmax(axis=1)] = residential_counts[rows]
+        
+        # Only zones with residential buildings and several periods need the multinomial
+        rows = np.flatnonzero(~single_period & (residential_counts > 0))
+        if len(rows):
+            period_counts[rows] = self.rng.multinomial(residential_counts[rows], year_percentages[rows])
+        return period_counts
     
     def by_census_osm(self, census_gdf: gpd.GeoDataFrame = None, buildings_gdf: gpd.GeoDataFrame = None) -> Optional[Dict[str, Any]]:
         """Distribute construction years E8-E16 to residential buildings and calculate related features"""
@@ -66,109 +135,92 @@ class BuildingConstructionYearCalculator:
         
         # Original implementation for when called with arguments
         """Distribute construction years E8-E16 to residential buildings and calculate related features"""
-        try:
-            accuracy_report = {'zones_processed': 0, 'buildings_assigned': 0, 'accuracy_issues': []}
-            
-            self.pipeline.log_info(self.calculator_name, "Distributing construction features to residential buildings")
-            
-            for idx, zone in census_gdf.iterrows():
-                zone_id = zone.zone_id
-                residential_buildings = buildings_gdf[
-                    (buildings_gdf['census_zone_id'] == zone_id) & 
-                    (buildings_gdf['building_type'] == 'residential')
-                ]
-                
-                if len(residential_buildings) == 0:
-                    continue
-                
-                # Get census construction year counts
-                year_counts = {
-                    'E8': zone.E8, 'E9': zone.E9, 'E10': zone.E10, 'E11': zone.E11,
-                    'E12': zone.E12, 'E13': zone.E13, 'E14': zone.E14, 'E15': zone.E15, 'E16': zone.E16
-                }
-                
-                total_census_buildings = sum(year_counts.values())
-                total_residential = len(residential_buildings)
-                
-                # Calculate percentage distribution from census data
-                year_percentages = {}
-                if total_census_buildings > 0:
-                    for period, count in year_counts.items():
-                        year_percentages[period] = count / total_census_buildings
-                else:
-                    # If no census data, use uniform distribution
-                    num_periods = len([count for count in year_counts.values() if count > 0])
-                    if num_periods == 0:
-                        year_percentages = {'E12': 1.0}  # Default to 1971-1980 period
-                    else:
-                        for period, count in year_counts.items():
-                            year_percentages[period] = 1.0 / len(year_counts) if count >= 0 else 0
-                
-                # Calculate actual building assignments based on percentages
-                period_building_counts = {}
-                assigned_buildings = 0
-                
-                # Calculate counts for each period based on percentages
-                for period, percentage in year_percentages.items():
-                    if percentage > 0:
-                        count = round(percentage * total_residential)
-                        period_building_counts[period] = count
-                        assigned_buildings += count
-                
-                # Handle rounding discrepancies - distribute remaining buildings to largest periods
-                remaining = total_residential - assigned_buildings
-                if remaining != 0:
-                    # Sort periods by count (descending) and add remaining buildings
-                    sorted_periods = sorted(period_building_counts.items(), key=lambda x: x[1], reverse=True)
-                    for i in range(abs(remaining)):
-                        period = sorted_periods[i % len(sorted_periods)][0]
-                        if remaining > 0:
-                            period_building_counts[period] += 1
-                        else:
-                            period_building_counts[period] = max(0, period_building_counts[period] - 1)
-                
-                # Create period distribution with all three features
-                building_assignments = []
-                for period, count in period_building_counts.items():
-                    if count > 0:
-                        year_range = self.construction_year_ranges[period]
-                        for _ in range(int(count)):
-                            # Generate random year within period range
-                            random_year = random.randint(year_range[0], year_range[1])
-                            # Get TABULA period for this year
-                            tabula_period = self._get_tabula_period(random_year)
-                            
-                            building_assignments.append({
-                                'const_period_census': period,
-                                'const_year': random_year,
-                                'const_TABULA': tabula_period
-                            })
-                
-                # Record accuracy information
-                if total_residential != total_census_buildings:
-                    accuracy_report['accuracy_issues'].append({
-                        'zone_id': zone_id,
-                        'census_buildings': total_census_buildings,
-                        'actual_buildings': total_residential,
-                        'difference': total_residential - total_census_buildings,
-                        'method': 'percentage_distribution'
-                    })
-                
-                # Randomly assign all three features to buildings
-                random.shuffle(building_assignments)
-                for i, building_idx in enumerate(residential_buildings.index):
-                    if i < len(building_assignments):
-                        assignment = building_assignments[i]
-                        buildings_gdf.at[building_idx, 'const_period_census'] = assignment['const_period_census']
-                        buildings_gdf.at[building_idx, 'const_year'] = assignment['const_year']
-                        buildings_gdf.at[building_idx, 'const_TABULA'] = assignment['const_TABULA']
-                        accuracy_report['buildings_assigned'] += 1
-                
-                accuracy_report['zones_processed'] += 1
-            
-            self.pipeline.log_info(self.calculator_name, f"Distributed construction features for {accuracy_report['buildings_assigned']} buildings")
-            return buildings_gdf, accuracy_report
-            
-        except Exception as e:
-            self.pipeline.log_error(self.calculator_name, f"Failed to distribute construction features: {str(e)}")
-            return buildings_gdf, {'error': str(e)} 
\ No newline at end of file
+        accuracy_report = {'zones_processed': 0, 'buildings_assigned': 0, 'accuracy_issues': []}
+        
+        self.pipeline.log_info(self.calculator_name, "Distributing construction features to residential buildings")
+        
+        # Categorical building types make the residential mask an integer code comparison
+        if not isinstance(buildings_gdf['building_type'].dtype, pd.CategoricalDtype):
+            buildings_gdf['building_type'] = buildings_gdf['building_type'].astype('category')
+        
+        # Create output columns once so the bulk writes below never enlarge the frame or upcast it;
+        # period and TABULA labels are stored as categorical codes, years as nullable int32
+        building_count = len(buildings_gdf)
+        output_columns = {
+            'const_period_census': pd.Categorical.from_codes(np.full(building_count, -1), dtype=self._period_dtype),
+            'const_year': pd.arrays.IntegerArray(
+                np.zeros(building_count, dtype=np.int32), np.ones(building_count, dtype=bool)
+            ),
+            'const_TABULA': pd.Categorical.from_codes(np.full(building_count, -1), dtype=self._tabula_dtype)
+        }
+        for column, empty_values in output_columns.items():
+            if column not in buildings_gdf.columns:
+                buildings_gdf[column] = empty_values
+            elif buildings_gdf[column].dtype != empty_values.dtype:
+                buildings_gdf[column] = buildings_gdf[column].astype(empty_values.dtype)
+        
+        # Census construction year counts (E8-E16) as one array, one row per zone; a zone listed
+        # twice keeps its last row, as the last one processed used to overwrite the earlier ones
+        census_zones = census_gdf.drop_duplicates('zone_id', keep='last')
+        census_year_counts = census_zones[list(self._period_keys)].to_numpy()
+        zone_ids = census_zones['zone_id'].to_numpy()
+        
+        # Census row of every residential building (-1 if its zone has no census data)
+        # (positions rather than index labels, so no label lookups are needed when writing back)
+        residential_positions = np.flatnonzero((buildings_gdf['building_type'] == 'residential').to_numpy())
+        building_zone_rows = pd.Index(zone_ids).get_indexer(buildings_gdf['census_zone_id'].to_numpy()[residential_positions])
+        residential_counts = np.bincount(building_zone_rows[building_zone_rows >= 0], minlength=len(zone_ids))
+        
+        # Buildings per zone and period, for all zones at once
+        year_percentages = self._census_year_percentages(census_year_counts)
+        period_counts = self._allocate_period_counts(year_percentages, residential_counts)
+        
+        # One assignment slot per allocated building, zone by zone, shuffled within each zone
+        zone_slot_counts = period_counts.sum(axis=1)
+        slot_periods = np.repeat(np.tile(np.arange(len(self._period_keys)), len(zone_ids)), period_counts.ravel())
+        slot_zones = np.repeat(np.arange(len(zone_ids)), zone_slot_counts)
+        slot_periods = slot_periods[np.lexsort((self.rng.random(len(slot_periods)), slot_zones))]
+        
+        # Residential buildings in the same zone order; the first zone_slot_counts of each zone get a slot
+        building_order = np.argsort(building_zone_rows, kind='stable')
+        building_order = building_order[building_zone_rows[building_order] >= 0]
+        sorted_zone_rows = building_zone_rows[building_order]
+        zone_starts = np.cumsum(residential_counts) - residential_counts
+        rank_in_zone = np.arange(len(building_order)) - zone_starts[sorted_zone_rows]
+        assigned_positions = residential_positions[building_order[rank_in_zone < zone_slot_counts[sorted_zone_rows]]]
+        
+        # Draw a random year within its period range for every slot and look up its TABULA period
+        if NUMBA_AVAILABLE:
+            random_years, tabula_codes = sample_slot_years_jit(
+                slot_periods, self._period_lo, self._period_hi, self._tabula_upper_bounds,
+                int(self.rng.integers(2**31 - 1))
+            )
+        else:
+            random_years = self.rng.integers(self._period_lo[slot_periods], self._period_hi[slot_periods], endpoint=True)
+            tabula_codes = self._get_tabula_codes(random_years)
+        
+        # Assign all three features to buildings; labels go in as codes of the column categories
+        building_assignments = {
+            'const_period_census': pd.Categorical.from_codes(slot_periods, dtype=self._period_dtype),
+            'const_year': random_years,
+            'const_TABULA': pd.Categorical.from_codes(tabula_codes, dtype=self._tabula_dtype)
+        }
+        for column, values in building_assignments.items():
+            buildings_gdf.iloc[assigned_positions, buildings_gdf.columns.get_loc(column)] = values
+        
+        # Record accuracy information
+        processed_zones = residential_counts > 0
+        census_totals = census_year_counts.sum(axis=1)
+        accuracy_report['zones_processed'] = int(processed_zones.sum())
+        accuracy_report['buildings_assigned'] = len(assigned_positions)
+        mismatched = processed_zones & (residential_counts != census_totals)
+        accuracy_report['accuracy_issues'] = pd.DataFrame({
+            'zone_id': zone_ids[mismatched],
+            'census_buildings': census_totals[mismatched],
+            'actual_buildings': residential_counts[mismatched],
+            'difference': residential_counts[mismatched] - census_totals[mismatched],
+            'method': 'percentage_distribution'
+        }).to_dict('records')
+        
+        self.pipeline.log_info(self.calculator_name, f"Distributed construction features for {accuracy_report['buildings_assigned']} buildings")
+        return buildings_gdf, accuracy_report
\ No newline at end of file
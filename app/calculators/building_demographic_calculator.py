@@ -3,10 +3,142 @@ Building Demographic Calculator - Orchestrates census-OSM integration
 """
 from typing import Optional, Dict, Any
 import geopandas as gpd
-from shapely.geometry import shape, mapping
-import requests
+import shapely
+from shapely.geometry import shape
+import httpx
 import json
+import os
+import re
+import orjson
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+
+
+# Buildings per raster service request and number of requests in flight at once
+RASTER_CHUNK_SIZE = 100
+RASTER_MAX_WORKERS = 8
+
+# Rows per bulk INSERT ... ON CONFLICT statement (keeps bind parameters under the PostgreSQL limit)
+UPSERT_BATCH_SIZE = 1000
+
+# Building count from which areas are computed on several threads (shapely and pyproj release the GIL)
+PARALLEL_AREA_MIN_BUILDINGS = 50000
+
+# OSM tag fields kept as columns of the building GeoDataFrame
+OSM_TAG_COLUMNS = ['osm_building', 'osm_height_str', 'osm_levels_str']
+
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import h2  # Enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def utm32_areas(geometries):
+    """Area in square meters of WGS84 geometries projected to UTM 32N (NaN for missing geometries)"""
+    import pyproj
+    from .building_area_calculator import WGS84_TO_UTM32_PIPELINE
+    
+    # Transformers are not thread-safe, so each call builds its own
+    transformer = pyproj.Transformer.from_pipeline(WGS84_TO_UTM32_PIPELINE)
+    projected = shapely.transform(
+        geometries,
+        lambda coords: np.column_stack(transformer.transform(coords[:, 0], coords[:, 1]))
+    )
+    return shapely.area(projected)
+
+
+def sum_volumes_by_zone(zone_positions, volumes, is_residential, n_zones):
+    """Building count, total volume and residential volume per zone position, skipping unassigned buildings and missing volumes"""
+    assigned = zone_positions >= 0
+    counts = np.bincount(zone_positions[assigned], minlength=n_zones)
+    with_volume = assigned & ~np.isnan(volumes)
+    total_volumes = np.bincount(zone_positions[with_volume], weights=volumes[with_volume], minlength=n_zones)
+    residential = with_volume & is_residential
+    residential_volumes = np.bincount(zone_positions[residential], weights=volumes[residential], minlength=n_zones)
+    return counts, total_volumes, residential_volumes
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def sum_volumes_by_zone_jit(zone_positions, volumes, is_residential, n_zones):
+        """Compiled equivalent of sum_volumes_by_zone in a single pass over the buildings"""
+        counts = np.zeros(n_zones, dtype=np.int64)
+        total_volumes = np.zeros(n_zones, dtype=np.float64)
+        residential_volumes = np.zeros(n_zones, dtype=np.float64)
+        for i in range(zone_positions.size):
+            zone = zone_positions[i]
+            if zone < 0:
+                continue
+            counts[zone] += 1
+            if not np.isnan(volumes[i]):
+                total_volumes[zone] += volumes[i]
+                if is_residential[i]:
+                    residential_volumes[zone] += volumes[i]
+        return counts, total_volumes, residential_volumes
+
+
+# Characters stripped from OSM height tags before parsing ("12 m" -> "12")
+HEIGHT_UNIT_RE = re.compile(r'[m ]')
+
+# OSM building tag -> type code used by the height estimate (anything else is 0)
+HEIGHT_TYPE_CODES = {
+    'house': 1, 'detached': 1, 'residential': 1,
+    'apartments': 2,
+    'commercial': 3, 'retail': 3,
+    'industrial': 4, 'warehouse': 4
+}
+
+
+def estimate_heights_by_type(type_codes, areas):
+    """Estimated height in meters from building type code and area"""
+    return np.select(
+        [type_codes == 1, type_codes == 2, type_codes == 3, type_codes == 4],
+        [
+            np.where(areas < 200, 6.0, 9.0),
+            np.where(areas < 500, 15.0, 25.0),
+            4.0,
+            8.0
+        ],
+        # Default height based on area
+        default=np.select([areas < 100, areas < 300, areas < 800], [6.0, 9.0, 15.0], default=20.0)
+    )
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, parallel=True)
+    def estimate_heights_by_type_jit(type_codes, areas):
+        """Compiled equivalent of estimate_heights_by_type, one building per parallel iteration"""
+        out = np.empty(areas.size, dtype=np.float64)
+        for i in prange(areas.size):
+            code = type_codes[i]
+            area = areas[i]
+            if code == 1:
+                out[i] = 6.0 if area < 200 else 9.0
+            elif code == 2:
+                out[i] = 15.0 if area < 500 else 25.0
+            elif code == 3:
+                out[i] = 4.0
+            elif code == 4:
+                out[i] = 8.0
+            elif area < 100:
+                out[i] = 6.0
+            elif area < 300:
+                out[i] = 9.0
+            elif area < 800:
+                out[i] = 15.0
+            else:
+                out[i] = 20.0
+        return out
 
 
 class BuildingDemographicCalculator:
@@ -39,43 +171,32 @@ class BuildingDemographicCalculator:
                 self.pipeline.log_error(self.calculator_name, "No buildings found in building_geo")
                 return None
             
-            # Create demographic data for each building
-            building_demographics = []
-            for i, building in enumerate(buildings):
-                building_id = building.get('building_id')
-                
-                # Get population and families for this building
-                population = 0
-                families = 0
-                
-                if building_population_data:
-                    populations = building_population_data.get('building_populations', [])
-                    if i < len(populations):
-                        population = populations[i]
-                
-                if building_families_data:
-                    families_list = building_families_data.get('building_families', [])
-                    if i < len(families_list):
-                        families = families_list[i]
-                
-                # Create demographic record
-                demographic = {
-                    'building_id': building_id,
-                    'population': population,
-                    'families': families,
-                    'avg_family_size': 2.5 if families > 0 else 0,
-                    'demographic_type': 'residential'
-                }
-                
-                building_demographics.append(demographic)
+            # Create demographic data for all buildings at once, padding missing values with 0
+            n_buildings = len(buildings)
+            if not building_population_data and not building_families_data:
+                # No census results at all: every building gets zeros
+                population = families = np.zeros(n_buildings, dtype=np.int64)
+            else:
+                populations = building_population_data.get('building_populations', []) if building_population_data else []
+                families_list = building_families_data.get('building_families', []) if building_families_data else []
+                population = self._pad_to_buildings(populations, n_buildings)
+                families = self._pad_to_buildings(families_list, n_buildings)
+            
+            building_demographics = pd.DataFrame({
+                'building_id': [building.get('building_id') for building in buildings],
+                'population': population,
+                'families': families,
+                'avg_family_size': np.where(families > 0, 2.5, 0),
+                'demographic_type': 'residential'
+            }).to_dict('records')
             
             # Create result
             result = {
                 'project_id': building_geo.get('project_id'),
                 'scenario_id': building_geo.get('scenario_id'),
                 'building_demographics': building_demographics,
-                'total_population': sum(d['population'] for d in building_demographics),
-                'total_families': sum(d['families'] for d in building_demographics),
+                'total_population': population.sum().item(),
+                'total_families': families.sum().item(),
                 'calculation_method': 'simplified_pipeline'
             }
             
@@ -89,6 +210,14 @@ class BuildingDemographicCalculator:
             self.pipeline.log_error(self.calculator_name, f"Failed to calculate demographics: {str(e)}")
             return None
     
+    @staticmethod
+    def _pad_to_buildings(values, n_buildings: int) -> np.ndarray:
+        """Per-building values as an array of length n_buildings, zero-filled past the end of values"""
+        values = np.asarray(values[:n_buildings])
+        padded = np.zeros(n_buildings, dtype=values.dtype if values.size else np.int64)
+        padded[:len(values)] = values
+        return padded
+    
     def _get_project_boundary(self) -> Optional[Dict[str, Any]]:
         """Get project boundary from scenario_geo or data_manager"""
         scenario_geo = self.pipeline.get_feature_safely('scenario_geo', calculator_name=self.calculator_name)
@@ -135,6 +264,9 @@ class BuildingDemographicCalculator:
             pop_calc = BuildingPopulationCalculator(self.pipeline)
             family_calc = BuildingNFamiliesCalculator(self.pipeline)
             
+            # Step 0: Assign census zones once for all calculators
+            census_building_gdf = self._assign_census_zones(census_gdf, census_building_gdf)
+            
             # Step 1: Assign building types
             census_building_gdf = type_calc.by_census_osm(census_gdf, census_building_gdf)
             
@@ -220,42 +352,40 @@ class BuildingDemographicCalculator:
                 self.pipeline.log_error(self.calculator_name, "No census zones found in scenario_census_boundary")
                 return None
             
-            # Create GeoDataFrame from census zones
-            census_data = []
-            for zone in census_zones:
-                zone_props = zone.get('properties', {})
-                # Get E3 and E4 values, defaulting to 0 if not present
-                e3 = zone_props.get('E3', 0) or 0  # Handle None values
-                e4 = zone_props.get('E4', 0) or 0  # Handle None values
-                
-                # Get zone geometry, fallback to boundary geometry if not available
-                zone_geom = zone.get('geometry')
-                if not zone_geom:
-                    zone_geom = scenario_census_boundary['geometry']
-                
-                census_data.append({
-                    'zone_id': zone.get('zone_id'),
-                    'zone_geometry': shape(zone_geom),  # Use zone-specific geometry
-                    'total_n_buildings': 0,  # Will be calculated later
-                    'E3': e3,  # Residential buildings
-                    'E4': e4,  # Production buildings
-                    'total_n_res_buildings': e3 + e4,
-                    'E8': zone_props.get('E8', 0) or 0,
-                    'E9': zone_props.get('E9', 0) or 0,
-                    'E10': zone_props.get('E10', 0) or 0,
-                    'E11': zone_props.get('E11', 0) or 0,
-                    'E12': zone_props.get('E12', 0) or 0,
-                    'E13': zone_props.get('E13', 0) or 0,
-                    'E14': zone_props.get('E14', 0) or 0,
-                    'E15': zone_props.get('E15', 0) or 0,
-                    'E16': zone_props.get('E16', 0) or 0,
-                    'total_v_buildings': 0,  # Will be calculated later
-                    'total_v_res_buildings': 0,  # Will be calculated later
-                    'P1': zone_props.get('P1', 0) or 0,  # Total population
-                    'PF1': zone_props.get('PF1', 0) or 0  # Total families
-                })
+            # Create GeoDataFrame from census zones, one column at a time
+            zone_properties = [zone.get('properties', {}) for zone in census_zones]
+            
+            def census_column(key):
+                # Default to 0 if not present, handling None values
+                return np.array([props.get(key, 0) or 0 for props in zone_properties])
+            
+            # Get zone geometry, fallback to boundary geometry if not available
+            boundary_geometry = orjson.dumps(scenario_census_boundary['geometry']) if 'geometry' in scenario_census_boundary else None
+            zone_geometries = [
+                orjson.dumps(zone['geometry']) if zone.get('geometry') else boundary_geometry
+                for zone in census_zones
+            ]
+            
+            e3 = census_column('E3')  # Residential buildings
+            e4 = census_column('E4')  # Production buildings
+            n_zones = len(census_zones)
+            census_data = {
+                'zone_id': [zone.get('zone_id') for zone in census_zones],
+                'total_n_buildings': np.zeros(n_zones, dtype=np.int64),  # Will be calculated later
+                'E3': e3,
+                'E4': e4,
+                'total_n_res_buildings': e3 + e4,
+                **{key: census_column(key) for key in ('E8', 'E9', 'E10', 'E11', 'E12', 'E13', 'E14', 'E15', 'E16')},
+                'total_v_buildings': np.zeros(n_zones, dtype=np.float64),  # Will be calculated later
+                'total_v_res_buildings': np.zeros(n_zones, dtype=np.float64),  # Will be calculated later
+                'P1': census_column('P1'),  # Total population
+                'PF1': census_column('PF1')  # Total families
+            }
             
-            census_gdf = gpd.GeoDataFrame(census_data, geometry='zone_geometry', crs='EPSG:4326')
+            # Build all zone-specific geometries in one call
+            census_gdf = gpd.GeoDataFrame(
+                census_data, geometry=shapely.from_geojson(zone_geometries), crs='EPSG:4326'
+            ).rename_geometry('zone_geometry')
             self.pipeline.log_info(self.calculator_name, f"Created census GeoDataFrame with {len(census_gdf)} zones")
             return census_gdf
             
@@ -289,11 +419,12 @@ class BuildingDemographicCalculator:
             
             # Convert to GeoDataFrame
             buildings_data = []
+            building_geometries = []
             for building in osm_buildings:
+                building_geometries.append(orjson.dumps(building['geometry']))
                 buildings_data.append({
                     'building_id': building['building_id'],
                     'scenario_id': scenario_id,
-                    'geometry': shape(building['geometry']),
                     'osm_tags': building.get('properties', {}).get('osm_tags', {}),
                     'osm_usage': building.get('properties', {}).get('osm_usage', 'probably_residential_complex'),
                     'source': 'osm',
@@ -310,7 +441,14 @@ class BuildingDemographicCalculator:
                     'census_zone_id': None
                 })
             
-            census_building_gdf = gpd.GeoDataFrame(buildings_data, geometry='geometry', crs='EPSG:4326')
+            # Build all geometries in one call
+            census_building_gdf = gpd.GeoDataFrame(
+                buildings_data,
+                geometry=shapely.from_geojson(building_geometries),
+                crs='EPSG:4326'
+            )
+            # Tags used by the height estimate become typed columns once, instead of dict lookups per use
+            census_building_gdf[OSM_TAG_COLUMNS] = self._osm_tag_columns(census_building_gdf['osm_tags'])
             self.pipeline.log_info(self.calculator_name, f"Created building GeoDataFrame with {len(census_building_gdf)} buildings from OSM")
             return census_building_gdf
             
@@ -321,34 +459,26 @@ class BuildingDemographicCalculator:
     def _calculate_building_properties(self, census_building_gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
         """Calculate area, height, and volume for all buildings"""
         try:
-            # Import existing calculators
-            from .building_area_calculator import BuildingAreaCalculator
-            
-            area_calc = BuildingAreaCalculator(self.pipeline)
-            
-            # Calculate area for each building
-            for idx, building in census_building_gdf.iterrows():
-                try:
-                    # Calculate area using existing method
-                    geom_dict = mapping(building.geometry)
-                    area = area_calc._calculate_polygon_area(geom_dict)
-                    census_building_gdf.at[idx, 'area'] = area
-                    
-                except Exception as e:
-                    self.pipeline.log_warning(self.calculator_name, f"Failed to calculate area for building {building.building_id}: {str(e)}")
-                    # Set default area
-                    census_building_gdf.at[idx, 'area'] = 100.0
+            # Project all geometries to UTM 32N and take their areas with vectorized calls, split across CPUs for large sets
+            geometries = np.asarray(census_building_gdf.geometry.values)
+            n_workers = os.cpu_count() or 1
+            if len(geometries) >= PARALLEL_AREA_MIN_BUILDINGS and n_workers > 1:
+                with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                    areas = np.concatenate(list(executor.map(utm32_areas, np.array_split(geometries, n_workers))))
+            else:
+                areas = utm32_areas(geometries)
+            # Set default area where the geometry is missing
+            census_building_gdf['area'] = np.where(np.isfinite(areas), areas, 100.0)
             
             # MANDATORY: Use raster service for height calculation - DIRECT IMPLEMENTATION
             self.pipeline.log_info(self.calculator_name, "=== STARTING DIRECT RASTER SERVICE IMPLEMENTATION ===")
             
-            # Get raster service URL from configuration
-            raster_service_url = self.data_manager.configuration.get('raster_service_url')
-            if not raster_service_url:
-                # Try alternative configuration paths
-                services_config = self.data_manager.configuration.get('services', {})
-                raster_gateway = services_config.get('raster_gateway', {})
-                raster_service_url = raster_gateway.get('url')
+            # Get raster service URL from configuration, trying the alternative services path second
+            configuration = self.data_manager.configuration
+            raster_service_url = (
+                configuration.get('raster_service_url')
+                or configuration.get('services', {}).get('raster_gateway', {}).get('url')
+            )
             
             self.pipeline.log_info(self.calculator_name, f"DEBUG: raster_service_url from config = {raster_service_url}")
             
@@ -362,114 +492,109 @@ class BuildingDemographicCalculator:
                 self.pipeline.log_info(self.calculator_name, f"DEBUG: Calling raster service directly for {len(census_building_gdf)} buildings")
                 
                 # Process buildings in chunks to avoid timeout
-                chunk_size = 100
+                chunk_size = RASTER_CHUNK_SIZE
                 total_buildings = len(census_building_gdf)
                 num_chunks = (total_buildings + chunk_size - 1) // chunk_size
                 
                 self.pipeline.log_info(self.calculator_name, f"DEBUG: Processing {total_buildings} buildings in {num_chunks} chunks of {chunk_size}")
                 
-                # Store heights directly in GeoDataFrame
-                heights_calculated = 0
+                # Serialize every building as a GeoJSON Feature in one vectorized call
+                geometries = shapely.to_geojson(census_building_gdf.geometry.values)
+                features = [
+                    b'{"type":"Feature","geometry":' + (geometry.encode() if geometry is not None else b'null')
+                    + b',"properties":{"building_id":' + orjson.dumps(building_id) + b'}}'
+                    for geometry, building_id in zip(geometries, census_building_gdf['building_id'])
+                ]
                 
-                for chunk_idx in range(num_chunks):
-                    start_idx = chunk_idx * chunk_size
-                    end_idx = min((chunk_idx + 1) * chunk_size, total_buildings)
-                    chunk_buildings = census_building_gdf.iloc[start_idx:end_idx]
-                    
-                    self.pipeline.log_info(self.calculator_name, f"DEBUG: Processing chunk {chunk_idx + 1}/{num_chunks} ({len(chunk_buildings)} buildings)")
-                    
-                    # Create FeatureCollection for this chunk
-                    payload = {
-                        "type": "FeatureCollection",
-                        "features": []
-                    }
-                    
-                    # Map building index to building_id for this chunk
-                    chunk_building_map = {}
-                    
-                    for idx, building in chunk_buildings.iterrows():
-                        building_id = building['building_id']
-                        chunk_building_map[building_id] = idx
-                        
-                        payload["features"].append({
-                            "type": "Feature",
-                            "geometry": mapping(building.geometry),
-                            "properties": {
-                                "building_id": building_id
-                            }
-                        })
-                    
-                    # Log sample for first chunk
-                    if chunk_idx == 0 and payload["features"]:
-                        sample_coords = payload["features"][0]["geometry"]["coordinates"]
-                        self.pipeline.log_info(self.calculator_name, f"DEBUG: Sample coordinates being sent: {sample_coords}")
-                    
-                    # Call raster service for this chunk
-                    try:
-                        response = requests.post(
-                            raster_service_url,
-                            json=payload,
-                            headers={'Content-Type': 'application/json'},
-                            timeout=300  # 5 minutes per chunk
-                        )
-                        
-                        self.pipeline.log_info(self.calculator_name, f"DEBUG: Chunk {chunk_idx + 1} HTTP response status: {response.status_code}")
+                # Log sample for first chunk
+                if features:
+                    self.pipeline.log_info(self.calculator_name, f"DEBUG: Sample geometry being sent: {geometries[0]}")
+                
+                # Create FeatureCollection body for every chunk up front, slicing the features list once per chunk
+                chunk_payloads = [
+                    b'{"type":"FeatureCollection","features":[' + b','.join(features[start_idx:start_idx + chunk_size]) + b']}'
+                    for start_idx in range(0, total_buildings, chunk_size)
+                ]
+                
+                # Collect heights by building_id and merge them into the GeoDataFrame once
+                height_map = {}
+                successful_chunks = 0
+                
+                # Chunks are independent: send them concurrently over one pooled (HTTP/2 when available) client
+                with httpx.Client(
+                    http2=HTTP2_AVAILABLE,
+                    timeout=300,  # 5 minutes per chunk
+                    limits=httpx.Limits(max_connections=RASTER_MAX_WORKERS, max_keepalive_connections=RASTER_MAX_WORKERS)
+                ) as client:
+                    with ThreadPoolExecutor(max_workers=max(1, min(RASTER_MAX_WORKERS, num_chunks))) as executor:
+                        futures = {
+                            executor.submit(
+                                client.post,
+                                raster_service_url,
+                                content=payload,
+                                headers={'Content-Type': 'application/json'}
+                            ): chunk_idx
+                            for chunk_idx, payload in enumerate(chunk_payloads)
+                        }
                         
-                        if response.status_code == 200:
-                            response_data = response.json()
-                            results = response_data.get('results', [])
+                        for future in as_completed(futures):
+                            chunk_idx = futures[future]
                             
-                            self.pipeline.log_info(self.calculator_name, f"DEBUG: Chunk {chunk_idx + 1} received {len(results)} height results")
-                            
-                            # Update GeoDataFrame directly with heights
-                            for result in results:
-                                building_id = result.get('building_id')
-                                height = result.get('height')
+                            # Collect raster service response for this chunk
+                            try:
+                                response = future.result()
                                 
-                                if building_id and height is not None:
-                                    # Find the building index in our GeoDataFrame
-                                    building_idx = chunk_building_map.get(building_id)
-                                    if building_idx is not None:
-                                        census_building_gdf.at[building_idx, 'height'] = round(float(height), 2)
-                                        heights_calculated += 1
+                                if response.status_code == 200:
+                                    response_data = response.json()
+                                    results = response_data.get('results', [])
+                                    successful_chunks += 1
+                                    
+                                    for result in results:
+                                        building_id = result.get('building_id')
+                                        height = result.get('height')
                                         
-                                        # Log first few heights for debugging
-                                        if heights_calculated <= 3:
-                                            self.pipeline.log_info(self.calculator_name, f"DEBUG: Set height {height} for building {building_id}")
-                            
-                            # Log sample response for first chunk
-                            if chunk_idx == 0:
-                                response_text = response.text[:500] if len(response.text) > 500 else response.text
-                                self.pipeline.log_info(self.calculator_name, f"DEBUG: Sample response data: {response_text}")
-                        else:
-                            self.pipeline.log_error(self.calculator_name, f"DEBUG: Chunk {chunk_idx + 1} failed with status {response.status_code}")
-                            self.pipeline.log_error(self.calculator_name, f"DEBUG: Response content: {response.text}")
-                            # Continue with other chunks
-                            
-                    except requests.exceptions.RequestException as e:
-                        self.pipeline.log_error(self.calculator_name, f"DEBUG: Chunk {chunk_idx + 1} HTTP request failed: {str(e)}")
-                        # Continue with other chunks
-                    except json.JSONDecodeError as e:
-                        self.pipeline.log_error(self.calculator_name, f"DEBUG: Chunk {chunk_idx + 1} JSON parse failed: {str(e)}")
-                        # Continue with other chunks
-                    except Exception as e:
-                        self.pipeline.log_error(self.calculator_name, f"DEBUG: Chunk {chunk_idx + 1} processing failed: {str(e)}")
-                        # Continue with other chunks
+                                        if building_id and height is not None:
+                                            height_map[building_id] = round(float(height), 2)
+                                    
+                                    # Log sample response for first chunk
+                                    if chunk_idx == 0:
+                                        response_text = response.text[:500] if len(response.text) > 500 else response.text
+                                        self.pipeline.log_info(self.calculator_name, f"DEBUG: Sample response data: {response_text}")
+                                else:
+                                    self.pipeline.log_error(self.calculator_name, f"DEBUG: Chunk {chunk_idx + 1} failed with status {response.status_code}")
+                                    self.pipeline.log_error(self.calculator_name, f"DEBUG: Response content: {response.text}")
+                                    # Continue with other chunks
+                                    
+                            except httpx.HTTPError as e:
+                                self.pipeline.log_error(self.calculator_name, f"DEBUG: Chunk {chunk_idx + 1} HTTP request failed: {str(e)}")
+                                # Continue with other chunks
+                            except json.JSONDecodeError as e:
+                                self.pipeline.log_error(self.calculator_name, f"DEBUG: Chunk {chunk_idx + 1} JSON parse failed: {str(e)}")
+                                # Continue with other chunks
+                            except Exception as e:
+                                self.pipeline.log_error(self.calculator_name, f"DEBUG: Chunk {chunk_idx + 1} processing failed: {str(e)}")
+                                # Continue with other chunks
+                
+                # Log first few heights for debugging, once rather than per result
+                for building_id, height in islice(height_map.items(), 3):
+                    self.pipeline.log_info(self.calculator_name, f"DEBUG: Set height {height} for building {building_id}")
+                
+                raster_heights = census_building_gdf['building_id'].map(height_map)
+                census_building_gdf['height'] = raster_heights.astype('float64')
+                heights_calculated = int(raster_heights.notna().sum())
                 
-                self.pipeline.log_info(self.calculator_name, f"DEBUG: Successfully calculated heights for {heights_calculated} buildings")
+                self.pipeline.log_info(self.calculator_name, f"DEBUG: {successful_chunks}/{num_chunks} chunks succeeded, calculated heights for {heights_calculated} buildings")
                 
                 # Set default height for buildings that didn't get heights from raster service
-                buildings_without_height = census_building_gdf['height'].isna().sum()
-                if buildings_without_height > 0:
-                    self.pipeline.log_warning(self.calculator_name, f"DEBUG: {buildings_without_height} buildings didn't get heights from raster service, using fallback")
+                without_height = raster_heights.isna().to_numpy()
+                if without_height.any():
+                    self.pipeline.log_warning(self.calculator_name, f"DEBUG: {int(without_height.sum())} buildings didn't get heights from raster service, using fallback")
                     
-                    for idx, building in census_building_gdf.iterrows():
-                        if pd.isna(building['height']):
-                            # Use fallback estimation
-                            area = building['area']
-                            osm_tags = building['osm_tags']
-                            fallback_height = self._estimate_building_height(osm_tags, area)
-                            census_building_gdf.at[idx, 'height'] = fallback_height
+                    # Use fallback estimation for the missing rows only
+                    missing_buildings = census_building_gdf.loc[without_height]
+                    census_building_gdf.loc[without_height, 'height'] = self._estimate_building_heights(
+                        missing_buildings, missing_buildings['area']
+                    )
                 
                 if heights_calculated == 0:
                     error_msg = "CRITICAL ERROR: No heights were calculated by raster service!"
@@ -483,25 +608,18 @@ class BuildingDemographicCalculator:
                 self.pipeline.log_error(self.calculator_name, error_msg)
                 raise ValueError(error_msg)
             
-            # Calculate volume and floors for each building
-            for idx, building in census_building_gdf.iterrows():
-                try:
-                    area = census_building_gdf.at[idx, 'area']
-                    height = census_building_gdf.at[idx, 'height']
-                    
-                    # Calculate volume
-                    volume = area * height
-                    census_building_gdf.at[idx, 'volume'] = volume
-                    
-                    # Calculate floors
-                    floors = max(1, int(height / 3.0))  # 3m per floor
-                    census_building_gdf.at[idx, 'number_of_floors'] = floors
-                    
-                except Exception as e:
-                    self.pipeline.log_warning(self.calculator_name, f"Failed to calculate volume/floors for building {building.building_id}: {str(e)}")
-                    # Set default values
-                    census_building_gdf.at[idx, 'volume'] = 1200.0
-                    census_building_gdf.at[idx, 'number_of_floors'] = 4
+            # Calculate volume and floors (3m per floor) for all buildings
+            area = census_building_gdf['area'].to_numpy(dtype=np.float64)
+            height = census_building_gdf['height'].to_numpy(dtype=np.float64)
+            valid_height = np.isfinite(height)
+            if not valid_height.all():
+                self.pipeline.log_warning(self.calculator_name, f"Failed to calculate volume/floors for {int((~valid_height).sum())} buildings without a valid height, using defaults")
+            
+            # Default values where the height is missing
+            census_building_gdf['volume'] = np.where(valid_height, area * height, 1200.0)
+            census_building_gdf['number_of_floors'] = np.where(
+                valid_height, np.maximum(1, np.floor(np.where(valid_height, height, 0.0) / 3.0)), 4
+            ).astype(np.int64)
             
             self.pipeline.log_info(self.calculator_name, f"Calculated properties for {len(census_building_gdf)} buildings")
             return census_building_gdf
@@ -513,58 +631,42 @@ class BuildingDemographicCalculator:
     def _update_heights_from_database(self, census_building_gdf: gpd.GeoDataFrame):
         """Update heights in GeoDataFrame from database after raster service calculation"""
         try:
-            from cim_wizard.models import BuildingProperties
+            from app.models.vector import BuildingProperties
+            
+            db_session = getattr(self.data_manager, 'db_session', None)
+            if db_session is None:
+                raise ValueError("No database session available")
             
             project_id = getattr(self.data_manager, 'project_id', 'temp')
             scenario_id = getattr(self.data_manager, 'scenario_id', 'temp')
             
-            self.pipeline.log_info(self.calculator_name, f"DEBUG: _update_heights_from_database called")
-            self.pipeline.log_info(self.calculator_name, f"DEBUG: project_id = {project_id}")
-            self.pipeline.log_info(self.calculator_name, f"DEBUG: scenario_id = {scenario_id}")
-            self.pipeline.log_info(self.calculator_name, f"DEBUG: Processing {len(census_building_gdf)} buildings")
-            
-            heights_found = 0
-            heights_missing = 0
-            
-            for idx, building in census_building_gdf.iterrows():
-                try:
-                    building_id = building['building_id']
-                    lod = building['lod']
-                    
-                    self.pipeline.log_info(self.calculator_name, f"DEBUG: Looking for building_id={building_id}, lod={lod}")
-                    
-                    building_props = BuildingProperties.objects.get(
-                        building_id=building_id,
-                        project_id=project_id,
-                        scenario_id=scenario_id,
-                        lod=lod
-                    )
-                    
-                    if building_props.height is not None:
-                        census_building_gdf.at[idx, 'height'] = building_props.height
-                        heights_found += 1
-                        self.pipeline.log_info(self.calculator_name, f"DEBUG: Found height {building_props.height} for building {building_id}")
-                    else:
-                        heights_missing += 1
-                        self.pipeline.log_warning(self.calculator_name, f"DEBUG: Building {building_id} found in DB but height is None")
-                        # Use fallback estimation
-                        height = self._estimate_building_height(building['osm_tags'], building['area'])
-                        census_building_gdf.at[idx, 'height'] = height
-                        
-                except BuildingProperties.DoesNotExist:
-                    heights_missing += 1
-                    self.pipeline.log_warning(self.calculator_name, f"DEBUG: Building {building_id} NOT found in database")
-                    # Use fallback estimation
-                    height = self._estimate_building_height(building['osm_tags'], building['area'])
-                    census_building_gdf.at[idx, 'height'] = height
-                except Exception as e:
-                    heights_missing += 1
-                    self.pipeline.log_error(self.calculator_name, f"DEBUG: Error retrieving building {building_id}: {str(e)}")
-                    # Use fallback estimation
-                    height = self._estimate_building_height(building['osm_tags'], building['area'])
-                    census_building_gdf.at[idx, 'height'] = height
-            
-            self.pipeline.log_info(self.calculator_name, f"DEBUG: Heights summary - Found: {heights_found}, Missing: {heights_missing}")
+            self.pipeline.log_info(self.calculator_name, f"DEBUG: Loading heights of {len(census_building_gdf)} buildings for project {project_id}, scenario {scenario_id}")
+            
+            # Fetch the stored heights of all buildings with a single query
+            building_ids = census_building_gdf['building_id'].unique().tolist()
+            rows = db_session.query(
+                BuildingProperties.building_id,
+                BuildingProperties.lod,
+                BuildingProperties.height
+            ).filter(
+                BuildingProperties.project_id == project_id,
+                BuildingProperties.scenario_id == scenario_id,
+                BuildingProperties.building_id.in_(building_ids)
+            ).all()
+            
+            db_heights = pd.DataFrame(rows, columns=['building_id', 'lod', 'height'])
+            heights = np.array(census_building_gdf[['building_id', 'lod']].merge(
+                db_heights, on=['building_id', 'lod'], how='left'
+            )['height'], dtype=np.float64)
+            
+            # Use fallback estimation for buildings missing from the database or stored without height
+            missing = np.isnan(heights)
+            if missing.any():
+                missing_buildings = census_building_gdf.loc[missing]
+                heights[missing] = self._estimate_building_heights(missing_buildings, missing_buildings['area'])
+            census_building_gdf['height'] = heights
+            
+            self.pipeline.log_info(self.calculator_name, f"DEBUG: Heights summary - Found: {int((~missing).sum())}, Missing: {int(missing.sum())}")
                     
         except Exception as e:
             self.pipeline.log_error(self.calculator_name, f"DEBUG: Failed to update heights from database: {str(e)}")
@@ -573,102 +675,84 @@ class BuildingDemographicCalculator:
     
     def _calculate_heights_fallback(self, census_building_gdf: gpd.GeoDataFrame, height_calc=None):
         """Fallback height calculation using OSM tags and estimation"""
-        for idx, building in census_building_gdf.iterrows():
-            try:
-                # Try OSM height first, then estimation
-                height = None
-                
-                # Check OSM tags for height
-                osm_tags = building['osm_tags']
-                if 'height' in osm_tags:
-                    try:
-                        height_str = osm_tags['height'].replace('m', '').replace(' ', '')
-                        height = float(height_str)
-                    except:
-                        pass
-                
-                if height is None and 'levels' in osm_tags:
-                    try:
-                        levels = int(osm_tags['levels'])
-                        height = levels * 3.0  # 3m per floor
-                    except:
-                        pass
-                
-                # If still no height, use estimation
-                if height is None:
-                    area = census_building_gdf.at[idx, 'area']
-                    height = self._estimate_building_height(osm_tags, area)
-                
-                census_building_gdf.at[idx, 'height'] = height
-                
-            except Exception as e:
-                self.pipeline.log_warning(self.calculator_name, f"Failed to calculate height for building {building.building_id}: {str(e)}")
-                # Set default height
-                census_building_gdf.at[idx, 'height'] = 12.0
+        census_building_gdf['height'] = self._estimate_building_heights(
+            census_building_gdf, census_building_gdf['area']
+        )
     
     def _estimate_building_height(self, osm_tags: Dict[str, Any], area: float) -> float:
         """Estimate building height from OSM tags and area"""
-        # Check for height tag
-        if 'height' in osm_tags:
-            try:
-                height_str = osm_tags['height'].replace('m', '').replace(' ', '')
-                return float(height_str)
-            except:
-                pass
-        
-        # Check for levels tag
-        if 'levels' in osm_tags:
-            try:
-                levels = int(osm_tags['levels'])
-                return levels * 3.0  # 3m per floor
-            except:
-                pass
+        return float(self._estimate_building_heights(self._osm_tag_columns(pd.Series([osm_tags])), [area])[0])
+    
+    @staticmethod
+    def _osm_tag_columns(osm_tags: pd.Series) -> pd.DataFrame:
+        """Building type, height tag and levels tag of each OSM tag dict as columns"""
+        return pd.DataFrame({
+            'osm_building': pd.Categorical(osm_tags.map(lambda tags: tags.get('building', 'yes'))),
+            # Only string height tags are parsed ("12 m"); anything else counts as missing
+            'osm_height_str': osm_tags.map(lambda tags: tags['height'] if isinstance(tags.get('height'), str) else None),
+            'osm_levels_str': osm_tags.map(lambda tags: tags.get('levels'))
+        }, index=osm_tags.index)
+    
+    def _estimate_building_heights(self, buildings: pd.DataFrame, areas) -> np.ndarray:
+        """Estimate building heights from the OSM tag columns and areas for many buildings at once"""
+        # Check for height tag ("12 m" -> 12.0), then levels tag at 3m per floor
+        tag_heights = pd.to_numeric(buildings['osm_height_str'].str.replace(HEIGHT_UNIT_RE, '', regex=True), errors='coerce')
+        levels = pd.to_numeric(buildings['osm_levels_str'], errors='coerce')
+        levels = levels.where(levels == np.trunc(levels))  # Only whole numbers of levels
+        heights = np.array(tag_heights.fillna(levels * 3.0), dtype=np.float64)
         
         # Estimate based on building type and area
-        building_type = osm_tags.get('building', 'yes')
+        area = np.asarray(areas, dtype=np.float64)
+        # Map each distinct building tag once, then expand to all buildings through the category codes
+        building_tags = buildings['osm_building'].astype('category').cat
+        category_codes = np.array([HEIGHT_TYPE_CODES.get(tag, 0) for tag in building_tags.categories] + [0], dtype=np.int8)
+        type_codes = category_codes[building_tags.codes.to_numpy()]
+        if NUMBA_AVAILABLE:
+            estimated = estimate_heights_by_type_jit(type_codes, area)
+        else:
+            estimated = estimate_heights_by_type(type_codes, area)
+        
+        return np.where(np.isnan(heights), estimated, heights)
+    
+    def _assign_census_zones(self, census_gdf: gpd.GeoDataFrame, census_building_gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+        """Set census_zone_id of every building lying within a census zone with one STRtree query"""
+        tree = shapely.STRtree(census_gdf.geometry.values)
+        building_positions, zone_positions = tree.query(census_building_gdf.geometry.values, predicate='within')
+        
+        # Buildings outside every zone keep None
+        zone_ids = np.full(len(census_building_gdf), None, dtype=object)
+        zone_ids[building_positions] = census_gdf['zone_id'].to_numpy()[zone_positions]
+        census_building_gdf['census_zone_id'] = zone_ids
+        
+        self.pipeline.log_info(self.calculator_name, f"Assigned census zones to {len(np.unique(building_positions))} of {len(census_building_gdf)} buildings")
+        return census_building_gdf
+    
+    def _zone_volume_totals(self, census_gdf: gpd.GeoDataFrame, census_building_gdf: gpd.GeoDataFrame):
+        """Building count, total volume and residential volume per census zone (in census_gdf order)"""
+        # Totals are summed per distinct zone id, then repeated for every census row of that zone
+        zone_codes, unique_zone_ids = pd.factorize(census_gdf['zone_id'])
+        # Position of each building's census zone among the distinct ids (-1 when unassigned)
+        zone_positions = pd.Index(unique_zone_ids).get_indexer(census_building_gdf['census_zone_id']).astype(np.int64)
+        volumes = pd.to_numeric(census_building_gdf['volume'], errors='coerce').to_numpy(dtype=np.float64)
+        is_residential = (census_building_gdf['building_type'] == 'residential').to_numpy(dtype=bool)
         
-        if building_type in ['house', 'detached', 'residential']:
-            return 6.0 if area < 200 else 9.0
-        elif building_type in ['apartments', 'residential']:
-            return 15.0 if area < 500 else 25.0
-        elif building_type in ['commercial', 'retail']:
-            return 4.0
-        elif building_type in ['industrial', 'warehouse']:
-            return 8.0
+        if NUMBA_AVAILABLE:
+            totals = sum_volumes_by_zone_jit(zone_positions, volumes, is_residential, len(unique_zone_ids))
         else:
-            # Default height based on area
-            if area < 100:
-                return 6.0
-            elif area < 300:
-                return 9.0
-            elif area < 800:
-                return 15.0
-            else:
-                return 20.0
+            totals = sum_volumes_by_zone(zone_positions, volumes, is_residential, len(unique_zone_ids))
+        # Census rows without a zone id have code -1, which picks the appended zero
+        return tuple(np.append(total, 0)[zone_codes] for total in totals)
     
     def _update_census_building_counts(self, census_gdf: gpd.GeoDataFrame, census_building_gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
         """Update census zones with actual building counts and assign census_zone_id to buildings"""
         try:
-            # Spatial join to assign census zone to each building
-            buildings_with_zones = gpd.sjoin(census_building_gdf, census_gdf[['zone_id', 'zone_geometry']], 
-                                           how='left', predicate='within')
-            
-            # Update building GeoDataFrame with census zone assignments
-            for idx, building in buildings_with_zones.iterrows():
-                zone_id = building.get('zone_id')
-                if zone_id:
-                    census_building_gdf.at[idx, 'census_zone_id'] = zone_id
-            
-            # Count buildings per census zone
-            for idx, zone in census_gdf.iterrows():
-                zone_id = zone.zone_id
-                buildings_in_zone = census_building_gdf[census_building_gdf['census_zone_id'] == zone_id]
-                count = len(buildings_in_zone)
-                census_gdf.at[idx, 'total_n_buildings'] = count
-                
-                # Calculate total volume in zone
-                total_volume = float(buildings_in_zone['volume'].sum()) if count > 0 else 0.0
-                census_gdf.at[idx, 'total_v_buildings'] = total_volume
+            # Assign census zone to each building
+            census_building_gdf = self._assign_census_zones(census_gdf, census_building_gdf)
+            
+            # Count buildings and total volume per census zone
+            counts, total_volumes, _ = self._zone_volume_totals(census_gdf, census_building_gdf)
+            census_gdf['total_n_buildings'] = counts
+            census_gdf['total_v_buildings'] = total_volumes
             
             self.pipeline.log_info(self.calculator_name, f"Updated census zones with building counts")
             return census_gdf
@@ -680,15 +764,11 @@ class BuildingDemographicCalculator:
     def _calculate_residential_volumes(self, census_gdf: gpd.GeoDataFrame, census_building_gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
         """Calculate total residential volumes for each census zone"""
         try:
-            for idx, zone in census_gdf.iterrows():
-                zone_id = zone.zone_id
-                residential_buildings = census_building_gdf[
-                    (census_building_gdf['census_zone_id'] == zone_id) & 
-                    (census_building_gdf['building_type'] == 'residential')
-                ]
-                
-                total_residential_volume = residential_buildings['volume'].sum() if len(residential_buildings) > 0 else 0
-                census_gdf.at[idx, 'total_v_res_buildings'] = total_residential_volume
+            # Counts and total volumes come from the same pass over the buildings
+            counts, total_volumes, residential_volumes = self._zone_volume_totals(census_gdf, census_building_gdf)
+            census_gdf['total_n_buildings'] = counts
+            census_gdf['total_v_buildings'] = total_volumes
+            census_gdf['total_v_res_buildings'] = residential_volumes
             
             self.pipeline.log_info(self.calculator_name, f"Calculated residential volumes for {len(census_gdf)} census zones")
             return census_gdf
@@ -710,8 +790,10 @@ class BuildingDemographicCalculator:
                 self.pipeline.log_error(self.calculator_name, "Invalid project_boundary format")
                 return None
             
-            # Filter buildings within project boundary
-            within_boundary = census_building_gdf[census_building_gdf.geometry.within(boundary_geom)]
+            # Filter buildings within project boundary: one query on the frame's (cached) spatial index
+            # returns the buildings the boundary contains
+            candidates = census_building_gdf.sindex.query(boundary_geom, predicate='contains')
+            within_boundary = census_building_gdf.iloc[np.sort(candidates)]
             
             self.pipeline.log_info(self.calculator_name, f"Filtered to {len(within_boundary)} buildings within project boundary")
             return within_boundary
@@ -721,111 +803,117 @@ class BuildingDemographicCalculator:
             return None
     
     def _update_database(self, buildings_gdf: gpd.GeoDataFrame, project_id: str, scenario_id: str):
-        """Update database with building demographics"""
+        """Update database with building demographics using bulk upserts in one transaction"""
+        db_session = None
         try:
+            # Check the session before any per-building work
+            db_session = getattr(self.data_manager, 'db_session', None)
+            if db_session is None:
+                self.pipeline.log_warning(self.calculator_name, "No database session available - skipping database save")
+                return
+            
+            from app.models.vector import Building, BuildingProperties
+            from sqlalchemy.dialects.postgresql import insert
+            from geoalchemy2.elements import WKBElement
+            
             # Filter out buildings with no census_zone_id
             buildings_gdf = buildings_gdf[buildings_gdf['census_zone_id'].notnull()]
             
-            # Import Django models
-            try:
-                from cim_wizard.models import Building, BuildingProperties
-                from django.contrib.gis.geos import GEOSGeometry, MultiPolygon
-                import json
-                import pandas as pd
-                from shapely.geometry import mapping
-            except ImportError:
-                self.pipeline.log_warning(self.calculator_name, "Django models not available - skipping database save")
-                return
-            
             self.pipeline.log_info(self.calculator_name, f"Updating database with {len(buildings_gdf)} buildings")
             
-            # Convert census_id to integer, replacing nan with None
-            buildings_gdf['census_id'] = buildings_gdf['census_zone_id'].apply(
-                lambda x: int(x) if pd.notnull(x) else None
-            )
+            # One row per composite key (a repeated building would make ON CONFLICT fail)
+            buildings_gdf = buildings_gdf.drop_duplicates(subset=['building_id', 'lod'], keep='last')
+            if buildings_gdf.empty:
+                self.pipeline.log_warning(self.calculator_name, "No buildings to save")
+                return
             
-            # Update each building in the database
-            successful_updates = 0
-            for idx, building in buildings_gdf.iterrows():
-                try:
-                    # Convert geometry to GeoJSON format for database
-                    geom_json = mapping(building.geometry)
-                    
-                    # 1. Create/update Building record (geometry only)
-                    building_obj, building_created = Building.objects.get_or_create(
-                        building_id=building['building_id'],
-                        lod=building['lod'],
-                        defaults={
-                            'building_geometry': GEOSGeometry(json.dumps(geom_json)),
-                            'building_geometry_source': building['source'],
-                            'census_id': building['census_id']
-                        }
-                    )
-                    
-                    if not building_created:
-                        # Update existing building geometry
-                        building_obj.building_geometry = GEOSGeometry(json.dumps(geom_json))
-                        building_obj.building_geometry_source = building['source']
-                        building_obj.census_id = building['census_id']
-                        building_obj.save()
-                    
-                    # 2. Create/update BuildingProperties record (all demographic data)
-                    props_obj, props_created = BuildingProperties.objects.get_or_create(
-                        building_id=building['building_id'],
-                        project_id=project_id,
-                        scenario_id=scenario_id,
-                        lod=building['lod'],
-                        defaults={
-                            'height': float(building['height']) if pd.notnull(building['height']) else None,
-                            'area': float(building['area']) if pd.notnull(building['area']) else None,
-                            'volume': float(building['volume']) if pd.notnull(building['volume']) else None,
-                            'number_of_floors': int(building['number_of_floors']) if pd.notnull(building['number_of_floors']) else None,
-                            'filter_res': building['building_type'],
-                            'const_period_census': building['const_period_census'] if pd.notnull(building['const_period_census']) else None,
-                            'const_year': int(building['const_year']) if pd.notnull(building['const_year']) else None,
-                            'const_TABULA': building['const_TABULA'] if pd.notnull(building['const_TABULA']) else None,
-                            'n_people': int(building['n_people']) if pd.notnull(building['n_people']) else 0,
-                            'n_family': int(building['n_family']) if pd.notnull(building['n_family']) else 0
-                        }
-                    )
-                    
-                    if not props_created:
-                        # Update existing building properties
-                        props_obj.height = float(building['height']) if pd.notnull(building['height']) else None
-                        props_obj.area = float(building['area']) if pd.notnull(building['area']) else None
-                        props_obj.volume = float(building['volume']) if pd.notnull(building['volume']) else None
-                        props_obj.number_of_floors = int(building['number_of_floors']) if pd.notnull(building['number_of_floors']) else None
-                        props_obj.filter_res = building['building_type']
-                        props_obj.const_period_census = building['const_period_census'] if pd.notnull(building['const_period_census']) else None
-                        props_obj.const_year = int(building['const_year']) if pd.notnull(building['const_year']) else None
-                        props_obj.const_TABULA = building['const_TABULA'] if pd.notnull(building['const_TABULA']) else None
-                        props_obj.n_people = int(building['n_people']) if pd.notnull(building['n_people']) else 0
-                        props_obj.n_family = int(building['n_family']) if pd.notnull(building['n_family']) else 0
-                        props_obj.save()
-                    
-                    successful_updates += 1
-                    
-                except Exception as e:
-                    self.pipeline.log_error(self.calculator_name, f"Failed to update building {building['building_id']}: {str(e)}")
-                    continue
+            def numeric(column):
+                return pd.to_numeric(buildings_gdf[column], errors='coerce')
+            
+            # 1. Building records (geometry only), with all geometries encoded to WKB in one call
+            building_rows = self._to_records(pd.DataFrame({
+                'building_id': buildings_gdf['building_id'],
+                'lod': buildings_gdf['lod'],
+                'building_geometry': [WKBElement(wkb, srid=4326) for wkb in shapely.to_wkb(buildings_gdf.geometry.values)],
+                'building_geometry_source': buildings_gdf['source'],
+                # census_id as a nullable integer column
+                'census_id': pd.to_numeric(buildings_gdf['census_zone_id']).astype('Int64')
+            }, index=buildings_gdf.index))
+            
+            # 2. BuildingProperties records (all demographic data), each column coerced once
+            property_rows = self._to_records(pd.DataFrame({
+                'building_id': buildings_gdf['building_id'],
+                'project_id': project_id,
+                'scenario_id': scenario_id,
+                'lod': buildings_gdf['lod'],
+                'height': numeric('height').astype('float64'),
+                'area': numeric('area').astype('float64'),
+                'volume': numeric('volume').astype('float64'),
+                'number_of_floors': np.trunc(numeric('number_of_floors')).astype('Int64'),
+                'filter_res': buildings_gdf['building_type'] == 'residential',
+                'const_period_census': buildings_gdf['const_period_census'],
+                'const_year': np.trunc(numeric('const_year')).astype('Int64'),
+                'const_TABULA': buildings_gdf['const_TABULA'],
+                'n_people': np.trunc(numeric('n_people').fillna(0)).astype(np.int64),
+                'n_family': np.trunc(numeric('n_family').fillna(0)).astype(np.int64)
+            }, index=buildings_gdf.index))
+            
+            # Buildings first so the BuildingProperties foreign key is satisfied
+            for start in range(0, len(building_rows), UPSERT_BATCH_SIZE):
+                stmt = insert(Building).values(building_rows[start:start + UPSERT_BATCH_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['building_id', 'lod'],
+                    set_={
+                        'building_geometry': stmt.excluded.building_geometry,
+                        'building_geometry_source': stmt.excluded.building_geometry_source,
+                        'census_id': stmt.excluded.census_id
+                    }
+                )
+                db_session.execute(stmt)
             
-            self.pipeline.log_info(self.calculator_name, f"Successfully updated database with {successful_updates}/{len(buildings_gdf)} buildings")
+            property_columns = [column for column in property_rows[0] if column not in ('building_id', 'lod', 'project_id', 'scenario_id')]
+            for start in range(0, len(property_rows), UPSERT_BATCH_SIZE):
+                stmt = insert(BuildingProperties).values(property_rows[start:start + UPSERT_BATCH_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['building_id', 'lod', 'project_id', 'scenario_id'],
+                    set_={column: stmt.excluded[column] for column in property_columns}
+                )
+                db_session.execute(stmt)
+            
+            db_session.commit()
+            self.pipeline.log_info(self.calculator_name, f"Successfully updated database with {len(property_rows)}/{len(buildings_gdf)} buildings")
             
         except Exception as e:
+            if db_session is not None:
+                db_session.rollback()
             self.pipeline.log_error(self.calculator_name, f"Failed to update database: {str(e)}")
             raise
     
+    @staticmethod
+    def _to_records(frame: pd.DataFrame) -> list:
+        """Rows of frame as dicts of Python values, with None for missing values"""
+        columns = []
+        for column in frame.columns:
+            values = np.array(frame[column].astype(object), dtype=object)
+            values[pd.isna(values)] = None
+            columns.append(values)
+        return [dict(zip(frame.columns, row)) for row in zip(*columns)]
+    
     def _create_result(self, final_buildings, census_gdf, year_accuracy, pop_accuracy, family_accuracy, project_id, scenario_id, type_calc):
         """Create the final result dictionary"""
         # Get building type assignment errors from type_calc
         building_type_errors = getattr(type_calc, 'zone_assignment_errors', [])
         
+        # Residential count and census total are each reduced once and reused below
+        n_residential = int((final_buildings['building_type'].to_numpy() == 'residential').sum())
+        n_census_residential = int(census_gdf['total_n_res_buildings'].sum())
+        
         return {
             'project_id': project_id,
             'scenario_id': scenario_id,
             'building_demographics': {
                 'total_buildings': len(final_buildings),
-                'residential_buildings': len(final_buildings[final_buildings['building_type'] == 'residential']),
+                'residential_buildings': n_residential,
                 'total_population': float(final_buildings['n_people'].sum()),
                 'total_families': float(final_buildings['n_family'].sum()),
                 'total_volume': float(final_buildings['volume'].sum()),
@@ -839,9 +927,9 @@ class BuildingDemographicCalculator:
                 'building_type_assignment': {
                     'method': 'strict_criteria',
                     'criteria': 'height > 8m AND area > 100m²',
-                    'total_actual_residential': len(final_buildings[final_buildings['building_type'] == 'residential']),
-                    'total_census_residential': int(census_gdf['total_n_res_buildings'].sum()),
-                    'overall_error': len(final_buildings[final_buildings['building_type'] == 'residential']) - int(census_gdf['total_n_res_buildings'].sum()),
+                    'total_actual_residential': n_residential,
+                    'total_census_residential': n_census_residential,
+                    'overall_error': n_residential - n_census_residential,
                     'zone_errors': building_type_errors
                 }
             },
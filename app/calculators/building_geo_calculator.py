@@ -7,9 +7,20 @@ OSM Data Fetching:
 - To install osmnx: pip install osmnx
 """
 from typing import Optional, Dict, Any, List
+import gzip
+import hashlib
+import math
+import os
+import threading
+import time
 import uuid
+import numpy as np
 import requests
 import json
+import orjson
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+from app.core.settings import settings
 try:
     import osmnx as ox
     OSMNX_AVAILABLE = True
@@ -17,6 +28,149 @@ except ImportError:
     OSMNX_AVAILABLE = False
 
 
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+
+# Target tile side in degrees per Overpass request, most tiles per query, and tile requests in flight at once
+OVERPASS_TILE_DEGREES = 0.05
+OVERPASS_MAX_TILES = 16
+OVERPASS_MAX_WORKERS = 4
+
+# Minimum seconds between two Overpass requests (public instance rate limit)
+OVERPASS_MIN_INTERVAL = 0.5
+
+# Attempts per tile on rate limiting (429), server errors (5xx) or connection failures,
+# waiting OVERPASS_RETRY_BACKOFF seconds before the first retry and doubling after each one
+OVERPASS_MAX_ATTEMPTS = 4
+OVERPASS_RETRY_BACKOFF = 2.0
+
+
+# 'building' tag values that do not describe a building footprint
+EXCLUDED_BUILDING_VALUES = ['no', 'entrance', 'roof', 'bridge', 'tunnel']
+
+# PURELY NON-RESIDENTIAL buildings (exclude these from residential consideration);
+# 'building' comes first as the tag most buildings carry
+NON_RESIDENTIAL_INDICATORS = {
+    # Large commercial/industrial
+    'building': frozenset(['industrial', 'warehouse', 'factory', 'commercial', 'retail',
+                           'supermarket', 'school', 'hospital', 'church', 'mosque', 'synagogue',
+                           'university', 'college', 'public', 'civic']),
+    
+    # Institutional/Public buildings
+    'amenity': frozenset(['school', 'university', 'college', 'hospital', 'clinic', 'church',
+                          'place_of_worship', 'fire_station', 'police', 'post_office', 'townhall',
+                          'library', 'community_centre', 'social_facility']),
+    
+    # Infrastructure
+    'man_made': frozenset(['water_tower', 'pumping_station', 'reservoir_covered']),
+    'power': frozenset(['substation', 'generator']),
+    'railway': frozenset(['station']),
+    'aeroway': frozenset(['terminal']),
+    
+    # Tourism (hotels/hostels are typically not residential)
+    'tourism': frozenset(['hotel', 'motel', 'hostel']),
+    
+    # Healthcare facilities
+    'healthcare': frozenset(['hospital', 'clinic', 'nursing_home']),
+    
+    # Large sports/leisure facilities
+    'leisure': frozenset(['sports_centre', 'stadium', 'swimming_pool'])
+}
+
+# MIXED-USE INDICATORS (keep as potentially residential)
+# These are common in Turin and should NOT be filtered out
+MIXED_USE_INDICATORS = {
+    'shop': True,  # Ground floor shops with apartments above
+    'office': True,  # Offices with potential residential above
+    'craft': True,  # Small workshops with residential
+    'amenity': frozenset(['restaurant', 'cafe', 'bar', 'fast_food', 'pharmacy', 'bank', 'atm'])
+}
+
+# RESIDENTIAL INDICATORS
+RESIDENTIAL_INDICATORS = {
+    'building': frozenset(['residential', 'apartments', 'house', 'detached', 'semidetached',
+                           'terrace', 'bungalow', 'static_caravan', 'yes']),
+    'building:use': frozenset(['residential']),
+    'residential': True,
+}
+
+
+def tile_grid(lat_extent: float, lon_extent: float) -> tuple:
+    """Tiles per side (n_lat, n_lon) for a bounding box, at most OVERPASS_MAX_TILES in total"""
+    n_lat = max(1, math.ceil(lat_extent / OVERPASS_TILE_DEGREES))
+    n_lon = max(1, math.ceil(lon_extent / OVERPASS_TILE_DEGREES))
+    if n_lat * n_lon > OVERPASS_MAX_TILES:
+        # Grow the tiles evenly on both sides so their shape follows the bounding box
+        scale = math.sqrt(OVERPASS_MAX_TILES / (n_lat * n_lon))
+        n_lat = max(1, min(math.floor(n_lat * scale), OVERPASS_MAX_TILES))
+        n_lon = max(1, min(math.floor(n_lon * scale), OVERPASS_MAX_TILES // n_lat))
+    return n_lat, n_lon
+
+
+def tile_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float, n_lat: int, n_lon: int) -> List[tuple]:
+    """Split a bounding box into an n_lat x n_lon grid of (min_lat, min_lon, max_lat, max_lon) tiles"""
+    lat_step = (max_lat - min_lat) / n_lat
+    lon_step = (max_lon - min_lon) / n_lon
+    return [
+        (min_lat + i * lat_step, min_lon + j * lon_step,
+         max_lat if i == n_lat - 1 else min_lat + (i + 1) * lat_step,
+         max_lon if j == n_lon - 1 else min_lon + (j + 1) * lon_step)
+        for i in range(n_lat) for j in range(n_lon)
+    ]
+
+
+def overpass_cache_path(query: str) -> str:
+    """File holding the cached response of an Overpass query"""
+    key = hashlib.sha256(query.encode()).hexdigest()
+    return os.path.join(os.path.expanduser(settings.OSM_CACHE_DIR), f"{key}.json.gz")
+
+
+def read_overpass_cache(query: str) -> Optional[bytes]:
+    """Cached response body of an Overpass query, None if caching is disabled, missing or expired"""
+    if settings.OSM_CACHE_TTL <= 0:
+        return None
+    path = overpass_cache_path(query)
+    try:
+        if time.time() - os.path.getmtime(path) > settings.OSM_CACHE_TTL:
+            return None
+        with gzip.open(path, 'rb') as cache_file:
+            return cache_file.read()
+    except OSError:
+        return None
+
+
+def write_overpass_cache(query: str, content: bytes):
+    """Store a successful Overpass response body (a failed write only costs the cache entry)"""
+    if settings.OSM_CACHE_TTL <= 0:
+        return
+    path = overpass_cache_path(query)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(temp_path, 'wb') as cache_file:
+            cache_file.write(content)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+class OverpassRateLimiter:
+    """Space out requests shared by several threads by a minimum interval"""
+    
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+    
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+
 class BuildingGeoCalculator:
     """Calculate building geometry data"""
     
@@ -213,10 +367,10 @@ class BuildingGeoCalculator:
                 
                 # Handle different geometry types
                 if geom.get('type') == 'MultiPolygon':
-                    # For MultiPolygon, use the first polygon's coordinates
-                    coords = geom.get('coordinates', [[[]]])[0][0]
+                    # For MultiPolygon, use the outer ring of every polygon so the bounds cover all of them
+                    rings = [polygon[0] for polygon in geom.get('coordinates', []) if polygon and polygon[0]]
                 elif geom.get('type') == 'Polygon':
-                    coords = geom.get('coordinates', [[]])[0]
+                    rings = [ring for ring in geom.get('coordinates', [[]])[:1] if ring]
                 else:
                     self.pipeline.log_error(self.calculator_name, f"Unsupported geometry type: {geom.get('type')}")
                     return buildings
@@ -224,103 +378,123 @@ class BuildingGeoCalculator:
                 self.pipeline.log_error(self.calculator_name, "Invalid boundary geometry format")
                 return buildings
             
-            if not coords:
+            if not rings:
                 self.pipeline.log_error(self.calculator_name, "No valid coordinates found in boundary geometry")
                 return buildings
             
             # Calculate boundary bounds for Overpass query
-            lons = [coord[0] for coord in coords]
-            lats = [coord[1] for coord in coords]
-            min_lon, max_lon = min(lons), max(lons)
-            min_lat, max_lat = min(lats), max(lats)
-            
-            # Construct Overpass QL query with better building filtering
-            overpass_query = f"""
-            [out:json][timeout:25];
-            (
-              way["building"]({min_lat},{min_lon},{max_lat},{max_lon});
-              way["building:part"]({min_lat},{min_lon},{max_lat},{max_lon});
-              relation["building"]({min_lat},{min_lon},{max_lat},{max_lon});
-            );
-            out body;
-            >;
-            out skel qt;
-            """
-            
-            # Query Overpass API
-            overpass_url = "https://overpass-api.de/api/interpreter"
-            self.pipeline.log_info(self.calculator_name, f"Querying OSM Overpass API for buildings in bounds: {min_lat},{min_lon},{max_lat},{max_lon}")
-            
-            response = requests.post(overpass_url, data=overpass_query, timeout=30)
-            
-            if response.status_code != 200:
-                self.pipeline.log_error(self.calculator_name, f"Overpass API request failed: {response.status_code}")
-                return buildings
+            coords = np.concatenate([np.asarray(ring, dtype=np.float64)[:, :2] for ring in rings])
+            min_lon, min_lat = coords.min(axis=0).tolist()
+            max_lon, max_lat = coords.max(axis=0).tolist()
+            
+            # Split large bounding boxes into tiles that are queried concurrently
+            n_lat, n_lon = tile_grid(max_lat - min_lat, max_lon - min_lon)
+            tiles = tile_bbox(min_lat, min_lon, max_lat, max_lon, n_lat, n_lon)
+            self.pipeline.log_info(self.calculator_name, f"Querying OSM Overpass API for buildings in bounds: {min_lat},{min_lon},{max_lat},{max_lon} ({len(tiles)} tiles)")
+            
+            # Merge each tile as soon as it arrives so only one parsed response is held at a time;
+            # ways and nodes on tile edges are returned by several tiles, keep one copy of each
+            nodes = {}
+            ways = {}
+            rate_limiter = OverpassRateLimiter(OVERPASS_MIN_INTERVAL)
+            with requests.Session() as session:
+                with ThreadPoolExecutor(max_workers=min(OVERPASS_MAX_WORKERS, len(tiles))) as executor:
+                    futures = [executor.submit(self._fetch_overpass_tile, session, rate_limiter, tile) for tile in tiles]
+                    for future in as_completed(futures):
+                        elements = future.result()
+                        if elements is None:
+                            # A missing tile would leave a hole in the results; stop the remaining requests
+                            for pending in futures:
+                                pending.cancel()
+                            return buildings
+                        
+                        for element in elements:
+                            if element['type'] == 'node':
+                                # Only the coordinates of nodes are needed
+                                nodes[element['id']] = (element['lon'], element['lat'])
+                            elif element['type'] == 'way':
+                                ways[element['id']] = element
+            self.pipeline.log_info(self.calculator_name, f"Received {len(nodes)} nodes and {len(ways)} ways from OSM")
+            
+            # Only include ways with a 'building' tag (not just 'building:part') that is not excluded
+            building_ways = [
+                element for element in ways.values()
+                if 'building' in element.get('tags', {}) and element['tags']['building'] not in EXCLUDED_BUILDING_VALUES
+            ]
+            
+            # Resolve the node ids of all ways at once against the sorted node id table
+            node_ids = np.fromiter(nodes.keys(), dtype=np.int64, count=len(nodes))
+            node_coords = np.array(list(nodes.values()), dtype=np.float64).reshape(-1, 2)
+            order = np.argsort(node_ids)
+            node_ids = node_ids[order]
+            node_coords = node_coords[order]
             
-            osm_data = response.json()
-            self.pipeline.log_info(self.calculator_name, f"Received {len(osm_data.get('elements', []))} elements from OSM")
+            way_node_lists = [element.get('nodes', []) for element in building_ways]
+            way_lengths = np.fromiter((len(way_nodes) for way_nodes in way_node_lists), dtype=np.int64, count=len(way_node_lists))
+            way_node_ids = np.fromiter(chain.from_iterable(way_node_lists), dtype=np.int64, count=int(way_lengths.sum()))
+            positions = np.minimum(np.searchsorted(node_ids, way_node_ids), max(len(node_ids) - 1, 0))
+            found = node_ids[positions] == way_node_ids if len(node_ids) else np.zeros(len(way_node_ids), dtype=bool)
+            
+            # Coordinates of the nodes present in the response, split back per way
+            way_index = np.repeat(np.arange(len(building_ways)), way_lengths)[found]
+            found_counts = np.bincount(way_index, minlength=len(building_ways))
+            way_coords = np.split(node_coords[positions[found]], np.cumsum(found_counts)[:-1])
             
             # Process OSM elements
-            nodes = {node['id']: node for node in osm_data.get('elements', []) if node['type'] == 'node'}
-            
-            for element in osm_data.get('elements', []):
-                if element['type'] == 'way':
-                    tags = element.get('tags', {})
-                    # Only include if 'building' tag is present (not 'building:part')
-                    if 'building' not in tags:
-                        continue  # Exclude if not a building
-                    building_value = tags.get('building', '')
-                    excluded_values = ['no', 'entrance', 'roof', 'bridge', 'tunnel']
-                    if building_value not in excluded_values:
-                        # Get building coordinates
-                        building_coords = []
-                        for node_id in element.get('nodes', []):
-                            if node_id in nodes:
-                                node = nodes[node_id]
-                                building_coords.append([node['lon'], node['lat']])
-                        if len(building_coords) >= 3:  # Need at least 3 points for a polygon
-                            # Close the polygon if not already closed
-                            if building_coords[0] != building_coords[-1]:
-                                building_coords.append(building_coords[0])
-                            # Classify building usage based on OSM tags
-                            osm_usage = self._classify_building_usage_from_osm(tags)
-                            osm_id = f"way/{element['id']}"
-                            
-                            # Generate consistent building_id based on OSM ID
-                            # Generate UUID for building_id (source-independent)
-                            building_id = str(uuid.uuid4())
-                            
-                            building = {
-                                'building_id': building_id,
-                                'scenario_id': scenario_id,
-                                'geometry': {
-                                    'type': 'Polygon',
-                                    'coordinates': [building_coords]
-                                },
-                                'properties': {
-                                    'building_type': building_value if building_value != 'yes' else 'residential',
-                                    'source': 'osm',
-                                    'osm_id': osm_id,
-                                    'osm_tags': tags,
-                                    'osm_usage': osm_usage
-                                },
-                                'lod': 0
-                            }
-                            buildings.append(building)
+            footprints = []
+            for element, coords in zip(building_ways, way_coords):
+                if len(coords) < 3:  # Need at least 3 points for a polygon
+                    continue
+                # Close the polygon if not already closed
+                if not np.array_equal(coords[0], coords[-1]):
+                    coords = np.vstack([coords, coords[:1]])
+                
+                tags = element['tags']
+                building_value = tags['building']
+                # Classify building usage based on OSM tags
+                osm_usage = self._classify_building_usage_from_osm(tags)
+                osm_id = f"way/{element['id']}"
+                
+                # Generate consistent building_id based on OSM ID
+                # Generate UUID for building_id (source-independent)
+                building_id = str(uuid.uuid4())
+                
+                building = {
+                    'building_id': building_id,
+                    'scenario_id': scenario_id,
+                    'geometry': {
+                        'type': 'Polygon',
+                        'coordinates': [coords.tolist()]
+                    },
+                    'properties': {
+                        'building_type': building_value if building_value != 'yes' else 'residential',
+                        'source': 'osm',
+                        'osm_id': osm_id,
+                        'osm_tags': tags,
+                        'osm_usage': osm_usage
+                    },
+                    'lod': 0
+                }
+                buildings.append(building)
+                footprints.append(coords)
             
             self.pipeline.log_info(self.calculator_name, f"Processed {len(buildings)} building footprints from OSM")
+            if not buildings:
+                return buildings
             
             # Filter buildings to only include those within the actual boundary polygon
+            import shapely
             from shapely.geometry import shape
             try:
-                boundary_shape = shape(boundary_geom)
-                filtered_buildings = []
+                boundary_shape = shape(geom)
+                shapely.prepare(boundary_shape)
                 
-                for building in buildings:
-                    # Check if building centroid is within the actual boundary
-                    building_shape = shape(building['geometry'])
-                    if boundary_shape.contains(building_shape.centroid):
-                        filtered_buildings.append(building)
+                # Build all footprints straight from their ring coordinates and test their centroids
+                # against the boundary in single GEOS calls
+                ring_index = np.repeat(np.arange(len(footprints)), [len(footprint) for footprint in footprints])
+                building_shapes = shapely.polygons(shapely.linearrings(np.concatenate(footprints), indices=ring_index))
+                inside = shapely.contains(boundary_shape, shapely.centroid(building_shapes))
+                filtered_buildings = [building for building, is_inside in zip(buildings, inside) if is_inside]
                 
                 self.pipeline.log_info(self.calculator_name, f"Filtered to {len(filtered_buildings)} buildings within actual boundary (from {len(buildings)} in bounding box)")
                 
@@ -338,6 +512,75 @@ class BuildingGeoCalculator:
             self.pipeline.log_error(self.calculator_name, f"Error querying OSM buildings: {str(e)}")
             return buildings
     
+    def _fetch_overpass_tile(self, session: requests.Session, rate_limiter: OverpassRateLimiter, tile: tuple) -> Optional[List[Dict[str, Any]]]:
+        """Fetch the building ways (with their nodes) of one bounding box tile, None if the request failed"""
+        min_lat, min_lon, max_lat, max_lon = tile
+        
+        # Construct Overpass QL query with better building filtering
+        overpass_query = f"""
+        [out:json][timeout:25];
+        (
+          way["building"]({min_lat},{min_lon},{max_lat},{max_lon});
+          way["building:part"]({min_lat},{min_lon},{max_lat},{max_lon});
+          relation["building"]({min_lat},{min_lon},{max_lat},{max_lon});
+        );
+        out body;
+        >;
+        out skel qt;
+        """
+        
+        # Repeated runs over the same area reuse the stored response instead of querying Overpass again
+        content = read_overpass_cache(overpass_query)
+        from_cache = content is not None
+        if not from_cache:
+            content = self._post_overpass_query(session, rate_limiter, overpass_query)
+            if content is None:
+                return None
+        
+        # Overpass payloads can reach tens of MB; orjson parses the raw bytes much faster than response.json()
+        try:
+            elements = orjson.loads(content).get('elements', [])
+        except orjson.JSONDecodeError as e:
+            self.pipeline.log_error(self.calculator_name, f"Overpass API returned invalid JSON: {str(e)}")
+            return None
+        
+        if not from_cache:
+            write_overpass_cache(overpass_query, content)
+        return elements
+    
+    def _post_overpass_query(self, session: requests.Session, rate_limiter: OverpassRateLimiter, overpass_query: str) -> Optional[bytes]:
+        """Response body of an Overpass query, retrying transient failures with backoff; None once attempts run out"""
+        backoff = OVERPASS_RETRY_BACKOFF
+        for attempt in range(1, OVERPASS_MAX_ATTEMPTS + 1):
+            rate_limiter.wait()
+            try:
+                response = session.post(OVERPASS_URL, data=overpass_query, timeout=30)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+                retry_after = None
+            except requests.RequestException as e:
+                self.pipeline.log_error(self.calculator_name, f"Overpass API request failed: {str(e)}")
+                return None
+            else:
+                if response.status_code == 200:
+                    return response.content
+                if response.status_code != 429 and response.status_code < 500:
+                    self.pipeline.log_error(self.calculator_name, f"Overpass API request failed: {response.status_code}")
+                    return None
+                error = str(response.status_code)
+                retry_after = response.headers.get('Retry-After')
+            
+            if attempt == OVERPASS_MAX_ATTEMPTS:
+                break
+            # Honour the server's Retry-After when it gives one in seconds
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else backoff
+            self.pipeline.log_warning(self.calculator_name, f"Overpass API request failed: {error}, retrying in {delay:.0f}s (attempt {attempt}/{OVERPASS_MAX_ATTEMPTS})")
+            time.sleep(delay)
+            backoff *= 2
+        
+        self.pipeline.log_error(self.calculator_name, f"Overpass API request failed after {OVERPASS_MAX_ATTEMPTS} attempts: {error}")
+        return None
+    
     def _query_osm_buildings_with_osmnx(self, boundary_geom: Dict[str, Any], scenario_id: str) -> List[Dict[str, Any]]:
         """Query OSM buildings using osmnx library with strict criteria"""
         buildings = []
@@ -347,6 +590,7 @@ class BuildingGeoCalculator:
             return self._query_osm_buildings(boundary_geom, scenario_id)
         
         try:
+            import shapely
             from shapely.geometry import shape, mapping
             import geopandas as gpd
             
@@ -357,6 +601,8 @@ class BuildingGeoCalculator:
                 else:
                     geom = boundary_geom
                 boundary_shape = shape(geom)
+                # Index the boundary edges once for the centroid test
+                shapely.prepare(boundary_shape)
             else:
                 self.pipeline.log_error(self.calculator_name, "Invalid boundary geometry format")
                 return buildings
@@ -376,77 +622,71 @@ class BuildingGeoCalculator:
                 
                 self.pipeline.log_info(self.calculator_name, f"osmnx returned {len(gdf_buildings)} buildings")
                 
-                # Filter and process buildings
+                # Apply strict filter: must have 'building' tag (not just building:part) that is not excluded
+                if 'building' not in gdf_buildings.columns:
+                    self.pipeline.log_info(self.calculator_name, "osmnx processed 0 buildings successfully")
+                    return buildings
+                building_values = gdf_buildings['building'].map(lambda value: None if value is None else str(value))
+                keep = (
+                    building_values.notna().to_numpy()
+                    & ~building_values.isin(EXCLUDED_BUILDING_VALUES).to_numpy()
+                    & gdf_buildings.geom_type.isin(['Polygon', 'MultiPolygon']).to_numpy()
+                )
+                gdf_buildings = gdf_buildings[keep]
+                geometries = np.array(gdf_buildings.geometry.to_numpy(), dtype=object)
+                
+                # Convert to simple polygon if MultiPolygon: take the largest part (the first one on ties)
+                is_multi = shapely.get_type_id(geometries) == shapely.GeometryType.MULTIPOLYGON
+                if is_multi.any():
+                    parts, part_owner = shapely.get_parts(geometries[is_multi], return_index=True)
+                    order = np.lexsort((-shapely.area(parts), part_owner))
+                    _, first_of_owner = np.unique(part_owner[order], return_index=True)
+                    geometries[is_multi] = parts[order][first_of_owner]
+                
+                # Check if building is within the actual boundary (not just bounding box), all centroids at once
+                inside = shapely.contains(boundary_shape, shapely.centroid(geometries))
+                gdf_buildings = gdf_buildings[inside]
+                geometries = geometries[inside]
+                building_values = building_values[keep][inside]
+                
+                # Calculate area (rough estimate in square meters)
+                # For more accurate area calculation, we'd need to project to appropriate CRS
+                areas_sqm = shapely.area(geometries) * 111000 * 111000
+                
+                # Only the remaining buildings are turned into output dicts
+                tag_records = gdf_buildings.drop(columns='geometry').to_dict(orient='records')
                 processed_count = 0
-                for idx, building_row in gdf_buildings.iterrows():
-                    try:
-                        # Get OSM tags
-                        osm_tags = {}
-                        for col in gdf_buildings.columns:
-                            if col not in ['geometry'] and building_row[col] is not None:
-                                osm_tags[col] = str(building_row[col])
-                        
-                        # Apply strict filter: must have 'building' tag (not just building:part)
-                        if 'building' not in osm_tags:
-                            continue
-                        
-                        building_value = osm_tags.get('building', '')
-                        excluded_values = ['no', 'entrance', 'roof', 'bridge', 'tunnel']
-                        if building_value in excluded_values:
-                            continue
-                        
-                        # Get geometry
-                        geom = building_row.geometry
-                        if geom.geom_type not in ['Polygon', 'MultiPolygon']:
-                            continue
-                        
-                        # Convert to simple polygon if MultiPolygon
-                        if geom.geom_type == 'MultiPolygon':
-                            # Take the largest polygon
-                            geom = max(geom.geoms, key=lambda p: p.area)
-                        
-                        # Calculate area (rough estimate in square meters)
-                        # For more accurate area calculation, we'd need to project to appropriate CRS
-                        area_sqm = geom.area * 111000 * 111000
-                        
-                        # Classify building usage based on OSM tags (don't filter out)
-                        osm_usage = self._classify_building_usage_from_osm(osm_tags)
-                        
-                        # Get OSM ID from the index
-                        osm_id = f"{idx[0]}/{idx[1]}" if isinstance(idx, tuple) else str(idx)
-                        
-                        # Check if building is within the actual boundary (not just bounding box)
-                        if not boundary_shape.contains(geom.centroid):
-                            continue
-                        
-                        # Convert geometry to GeoJSON format
-                        geom_json = mapping(geom)
-                        
-                        # Generate a consistent building_id based on OSM ID
-                        # This ensures the same building always gets the same ID
-                        # Generate UUID for building_id (source-independent)
-                        building_id = str(uuid.uuid4())
-                        
-                        building = {
-                            'building_id': building_id,
-                            'scenario_id': scenario_id,
-                            'geometry': geom_json,
-                            'properties': {
-                                'building_type': building_value if building_value != 'yes' else 'residential',
-                                'source': 'osmnx',
-                                'osm_id': osm_id,
-                                'osm_tags': osm_tags,
-                                'estimated_area': area_sqm,
-                                'osm_usage': osm_usage
-                            },
-                            'lod': 0
-                        }
-                        buildings.append(building)
-                        processed_count += 1
-                        
-                    except Exception as e:
-                        self.pipeline.log_warning(self.calculator_name, f"Failed to process building {idx}: {str(e)}")
-                        continue
+                for idx, tag_record, building_value, geom, area_sqm in zip(
+                    gdf_buildings.index, tag_records, building_values, geometries, areas_sqm
+                ):
+                    # Get OSM tags
+                    osm_tags = {col: str(value) for col, value in tag_record.items() if value is not None}
+                    
+                    # Classify building usage based on OSM tags (don't filter out)
+                    osm_usage = self._classify_building_usage_from_osm(osm_tags)
+                    
+                    # Get OSM ID from the index
+                    osm_id = f"{idx[0]}/{idx[1]}" if isinstance(idx, tuple) else str(idx)
+                    
+                    # Generate UUID for building_id (source-independent)
+                    building_id = str(uuid.uuid4())
+                    
+                    building = {
+                        'building_id': building_id,
+                        'scenario_id': scenario_id,
+                        'geometry': mapping(geom),
+                        'properties': {
+                            'building_type': building_value if building_value != 'yes' else 'residential',
+                            'source': 'osmnx',
+                            'osm_id': osm_id,
+                            'osm_tags': osm_tags,
+                            'estimated_area': float(area_sqm),
+                            'osm_usage': osm_usage
+                        },
+                        'lod': 0
+                    }
+                    buildings.append(building)
+                    processed_count += 1
                 
                 self.pipeline.log_info(self.calculator_name, f"osmnx processed {processed_count} buildings successfully")
                 
@@ -507,68 +747,23 @@ class BuildingGeoCalculator:
     def _classify_building_usage_from_osm(self, osm_tags: Dict[str, Any]) -> str:
         """Classify building usage based on OSM tags - designed for Turin's mixed-use patterns"""
         
-        # PURELY NON-RESIDENTIAL buildings (exclude these from residential consideration)
-        non_residential_indicators = {
-            # Institutional/Public buildings
-            'amenity': ['school', 'university', 'college', 'hospital', 'clinic', 'church', 
-                       'place_of_worship', 'fire_station', 'police', 'post_office', 'townhall',
-                       'library', 'community_centre', 'social_facility'],
-            
-            # Large commercial/industrial
-            'building': ['industrial', 'warehouse', 'factory', 'commercial', 'retail', 
-                        'supermarket', 'school', 'hospital', 'church', 'mosque', 'synagogue',
-                        'university', 'college', 'public', 'civic'],
-            
-            # Infrastructure
-            'man_made': ['water_tower', 'pumping_station', 'reservoir_covered'],
-            'power': ['substation', 'generator'],
-            'railway': ['station'],
-            'aeroway': ['terminal'],
-            
-            # Tourism (hotels/hostels are typically not residential)
-            'tourism': ['hotel', 'motel', 'hostel'],
-            
-            # Healthcare facilities
-            'healthcare': ['hospital', 'clinic', 'nursing_home'],
-            
-            # Large sports/leisure facilities
-            'leisure': ['sports_centre', 'stadium', 'swimming_pool']
-        }
-        
         # Check for purely non-residential indicators
-        for tag_key, excluded_values in non_residential_indicators.items():
+        for tag_key, excluded_values in NON_RESIDENTIAL_INDICATORS.items():
             if tag_key in osm_tags:
                 tag_value = str(osm_tags[tag_key]).lower()
                 if tag_value in excluded_values:
                     return 'not_residential_based_on_osm'
         
-        # MIXED-USE INDICATORS (keep as potentially residential)
-        # These are common in Turin and should NOT be filtered out
-        mixed_use_indicators = {
-            'shop': True,  # Ground floor shops with apartments above
-            'office': True,  # Offices with potential residential above
-            'craft': True,  # Small workshops with residential
-            'amenity': ['restaurant', 'cafe', 'bar', 'fast_food', 'pharmacy', 'bank', 'atm']
-        }
-        
         # Check for mixed-use indicators
         has_mixed_use = False
-        for tag_key, values in mixed_use_indicators.items():
+        for tag_key, values in MIXED_USE_INDICATORS.items():
             if tag_key in osm_tags:
                 if values is True or str(osm_tags[tag_key]).lower() in values:
                     has_mixed_use = True
                     break
         
-        # RESIDENTIAL INDICATORS
-        residential_indicators = {
-            'building': ['residential', 'apartments', 'house', 'detached', 'semidetached', 
-                        'terrace', 'bungalow', 'static_caravan', 'yes'],
-            'building:use': ['residential'],
-            'residential': True,
-        }
-        
         # Check for explicit residential indicators
-        for tag_key, values in residential_indicators.items():
+        for tag_key, values in RESIDENTIAL_INDICATORS.items():
             if tag_key in osm_tags:
                 tag_value = str(osm_tags[tag_key]).lower()
                 if values is True or tag_value in values:
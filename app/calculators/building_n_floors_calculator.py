@@ -148,20 +148,20 @@ class BuildingNFloorsCalculator:
                 lod = building.get('lod', 0)
                 
                 try:
-                    # Query with all composite key fields
-                    props = db_session.query(BuildingProperties).filter(
-                        and_(
-                            BuildingProperties.building_id == building_id,
-                            BuildingProperties.project_id == project_id,
-                            BuildingProperties.scenario_id == scenario_id,
-                            BuildingProperties.lod == lod
-                        )
-                    ).first()
+                    # Query with all composite key fields, fetching only the compared column
+                    key_filter = and_(
+                        BuildingProperties.building_id == building_id,
+                        BuildingProperties.project_id == project_id,
+                        BuildingProperties.scenario_id == scenario_id,
+                        BuildingProperties.lod == lod
+                    )
+                    existing = db_session.query(BuildingProperties.number_of_floors).filter(key_filter).first()
                     
-                    if props:
-                        if props.number_of_floors != n_floors:  # Only update if different
-                            props.number_of_floors = n_floors
-                            db_session.add(props)  # Mark as dirty
+                    if existing is not None:
+                        if existing.number_of_floors != n_floors:  # Only update if different
+                            db_session.query(BuildingProperties).filter(key_filter).update(
+                                {'number_of_floors': n_floors}, synchronize_session=False
+                            )
                             updated_count += 1
                     else:
                         # Create if doesn't exist
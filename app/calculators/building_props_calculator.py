@@ -116,16 +116,18 @@ class BuildingPropsCalculator:
             
             try:
                 # Check if record exists
-                props = db_session.query(BuildingProperties).filter(
-                    and_(
-                        BuildingProperties.building_id == building_id,
-                        BuildingProperties.project_id == project_id,
-                        BuildingProperties.scenario_id == scenario_id,
-                        BuildingProperties.lod == lod
-                    )
-                ).first()
+                exists = db_session.query(
+                    db_session.query(BuildingProperties).filter(
+                        and_(
+                            BuildingProperties.building_id == building_id,
+                            BuildingProperties.project_id == project_id,
+                            BuildingProperties.scenario_id == scenario_id,
+                            BuildingProperties.lod == lod
+                        )
+                    ).exists()
+                ).scalar()
                 
-                if not props:
+                if not exists:
                     # Create new record
                     props = BuildingProperties(
                         building_id=building_id,
@@ -175,20 +175,20 @@ class BuildingVolumeCalculator:
                 lod = building.get('lod', 0)
                 
                 try:
-                    # Query with all composite key fields
-                    props = db_session.query(BuildingProperties).filter(
-                        and_(
-                            BuildingProperties.building_id == building_id,
-                            BuildingProperties.project_id == project_id,
-                            BuildingProperties.scenario_id == scenario_id,
-                            BuildingProperties.lod == lod
-                        )
-                    ).first()
+                    # Query with all composite key fields, fetching only the compared column
+                    key_filter = and_(
+                        BuildingProperties.building_id == building_id,
+                        BuildingProperties.project_id == project_id,
+                        BuildingProperties.scenario_id == scenario_id,
+                        BuildingProperties.lod == lod
+                    )
+                    existing = db_session.query(BuildingProperties.volume).filter(key_filter).first()
                     
-                    if props:
-                        if props.volume != volume:  # Only update if different
-                            props.volume = volume
-                            db_session.add(props)  # Mark as dirty
+                    if existing is not None:
+                        if existing.volume != volume:  # Only update if different
+                            db_session.query(BuildingProperties).filter(key_filter).update(
+                                {'volume': volume}, synchronize_session=False
+                            )
                             updated_count += 1
                     else:
                         # Create if doesn't exist
@@ -7,6 +7,8 @@ from shapely.geometry import shape, mapping
 from shapely.ops import unary_union
 import json
 
+from app.core import response_cache
+
 
 class ScenarioCensusBoundaryCalculator:
     """Calculate scenario census boundary"""
@@ -112,6 +114,8 @@ class ScenarioCensusBoundaryCalculator:
                         census_shape = MultiPolygon([census_shape])
                     project_scenario.census_boundary = from_shape(census_shape, srid=4326)
                     db_session.commit()
+                    # The commit bumps updated_at, which /projects serves
+                    response_cache.invalidate("projects")
                     self.pipeline.log_info(self.calculator_name, f"Updated census boundary for project_scenario {project_id}/{scenario_id}")
                     return True
             else:
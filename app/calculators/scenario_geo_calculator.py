@@ -14,9 +14,9 @@ class ScenarioGeoCalculator:
     
     def calculate_from_scenario_geo(self) -> Optional[Dict[str, Any]]:
         """Create scenario geometry from UI project boundary input"""
-        # Validate that we have scenario_geo data (from UI POST request)
+        # Structure is checked once at the API boundary (boundary_feature_error); only presence is checked here
         scenario_geo_input = self.pipeline.get_feature_safely('scenario_geo', calculator_name=self.calculator_name)
-        if not self.pipeline.validate_dict(scenario_geo_input, "scenario_geo", self.calculator_name, ['type', 'geometry', 'properties']):
+        if not self.pipeline.validate_input(scenario_geo_input, "scenario_geo", self.calculator_name):
             return None
         
         self.pipeline.log_info(self.calculator_name, "Creating scenario geometry from UI project boundary input")
@@ -35,12 +35,8 @@ class ScenarioGeoCalculator:
                 scenario_id = project_id  # Default to same as project for baseline
             
             # Extract geometry and properties from GeoJSON Feature
-            geometry = scenario_geo_input.get('geometry', {})
-            properties = scenario_geo_input.get('properties', {})
-            
-            # Validate geometry
-            if not self.pipeline.validate_geometry(geometry, "project_boundary", self.calculator_name):
-                return None
+            geometry = scenario_geo_input['geometry']
+            properties = scenario_geo_input.get('properties') or {}
             
             # Calculate project center from geometry or use provided map center
             project_center = None
@@ -53,8 +49,9 @@ class ScenarioGeoCalculator:
                     ]
                 }
             else:
-                # Calculate centroid from polygon coordinates
-                coords = geometry.get('coordinates', [[]])[0]
+                # Calculate centroid from the outer ring (of the first polygon for a MultiPolygon)
+                coordinates = geometry['coordinates']
+                coords = coordinates[0][0] if geometry['type'] == 'MultiPolygon' else coordinates[0]
                 if coords:
                     center_lon = sum(coord[0] for coord in coords) / len(coords)
                     center_lat = sum(coord[1] for coord in coords) / len(coords)
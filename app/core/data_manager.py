@@ -6,7 +6,8 @@ Now with direct database access to census and raster services
 
 import json
 import os
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 from sqlalchemy.orm import Session
 
@@ -14,6 +15,20 @@ from app.services.census_service import CensusService
 from app.services.raster_service import RasterService
 
 
+@lru_cache(maxsize=8)
+def _read_configuration(config_path: str, mtime: float) -> Dict[str, Any]:
+    """Parse configuration file once per (path, modification time)"""
+    with open(config_path, 'r') as f:
+        configuration = json.load(f)
+    
+    # Update service URLs to indicate internal services
+    if 'services' in configuration:
+        configuration['services']['raster_gateway']['url'] = "internal://raster_service"
+        configuration['services']['census_gateway']['url'] = "internal://census_service"
+    
+    return configuration
+
+
 class FeatureMethodSelector:
     """Represents a specific feature.method combination for chaining"""
     
@@ -105,6 +120,7 @@ class CimWizardDataManager:
         
         # Configuration
         self.configuration = None
+        self.configuration_key: Optional[Tuple[str, float]] = None
         self.load_configuration(config_path)
         
         # Feature proxies for chaining
@@ -125,26 +141,25 @@ class CimWizardDataManager:
         self.building_geo_lod12 = FeatureProxy('building_geo_lod12')
     
     def load_configuration(self, config_path: str = None):
-        """Load configuration from JSON file"""
+        """Load configuration from JSON file (parsed once and shared across instances)"""
         if config_path is None:
             # Default configuration path
             config_path = Path(__file__).parent / "configuration.json"
         
         try:
-            with open(config_path, 'r') as f:
-                self.configuration = json.load(f)
-                
-            # Update service URLs to indicate internal services
-            if 'services' in self.configuration:
-                self.configuration['services']['raster_gateway']['url'] = "internal://raster_service"
-                self.configuration['services']['census_gateway']['url'] = "internal://census_service"
+            config_path = str(config_path)
+            self.configuration_key = (config_path, os.path.getmtime(config_path))
+            # Shared between data managers - treat as read-only
+            self.configuration = _read_configuration(*self.configuration_key)
                 
         except FileNotFoundError:
             print(f"Warning: Configuration file not found at {config_path}")
             self.configuration = {}
+            self.configuration_key = None
         except json.JSONDecodeError as e:
             print(f"Error parsing configuration file: {e}")
             self.configuration = {}
+            self.configuration_key = None
     
     def get_census_service(self) -> CensusService:
         """Get or create census service instance"""
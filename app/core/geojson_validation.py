@@ -0,0 +1,128 @@
+"""
+GeoJSON payload validation
+Structural checks run once at the API boundary so downstream calculators and
+services can rely on well-formed geometries
+"""
+
+from typing import Any, Optional
+
+
+GEOMETRY_TYPES = frozenset({
+    'Point', 'MultiPoint', 'LineString', 'MultiLineString',
+    'Polygon', 'MultiPolygon', 'GeometryCollection'
+})
+
+# Nesting depth of the coordinates array for each geometry type
+COORDINATE_DEPTH = {
+    'Point': 1,
+    'MultiPoint': 2,
+    'LineString': 2,
+    'MultiLineString': 3,
+    'Polygon': 3,
+    'MultiPolygon': 4
+}
+
+# Fewest positions shapely accepts for a line and for a (closed) polygon ring
+MIN_LINE_POSITIONS = 2
+MIN_RING_POSITIONS = 4
+
+# Geometry types accepted for a project boundary
+BOUNDARY_TYPES = frozenset({'Polygon', 'MultiPolygon'})
+
+
+def _coordinates_error(coordinates: Any, depth: int) -> Optional[str]:
+    """Check coordinates nest to the expected depth and end in numeric positions"""
+    if not isinstance(coordinates, (list, tuple)):
+        return "coordinates must be an array"
+    if depth == 1:
+        if len(coordinates) < 2:
+            return "position must have at least two values"
+        for value in coordinates:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return "position values must be numbers"
+        return None
+    for item in coordinates:
+        error = _coordinates_error(item, depth - 1)
+        if error:
+            return error
+    return None
+
+
+def _polygon_error(rings: list) -> Optional[str]:
+    """Check a polygon has at least one ring and every ring has enough positions to be closed"""
+    if not rings:
+        return "polygon must have at least one ring"
+    for ring in rings:
+        if len(ring) < MIN_RING_POSITIONS:
+            return f"polygon rings must have at least {MIN_RING_POSITIONS} positions"
+    return None
+
+
+def _shape_error(geometry_type: str, coordinates: list) -> Optional[str]:
+    """Check position counts shapely needs to build the geometry (coordinates already well nested)"""
+    if geometry_type == 'LineString':
+        lines = [coordinates]
+    elif geometry_type == 'MultiLineString':
+        lines = coordinates
+    elif geometry_type == 'Polygon':
+        return _polygon_error(coordinates)
+    elif geometry_type == 'MultiPolygon':
+        for polygon in coordinates:
+            error = _polygon_error(polygon)
+            if error:
+                return error
+        return None
+    else:
+        return None
+    for line in lines:
+        if len(line) < MIN_LINE_POSITIONS:
+            return f"lines must have at least {MIN_LINE_POSITIONS} positions"
+    return None
+
+
+def geometry_error(geometry: Any) -> Optional[str]:
+    """Return a description of what is wrong with a GeoJSON geometry, or None if valid"""
+    if not isinstance(geometry, dict):
+        return "geometry must be an object"
+
+    geometry_type = geometry.get('type')
+    if not isinstance(geometry_type, str) or geometry_type not in GEOMETRY_TYPES:
+        return f"unsupported geometry type: {geometry_type}"
+
+    if geometry_type == 'GeometryCollection':
+        geometries = geometry.get('geometries')
+        if not isinstance(geometries, list):
+            return "GeometryCollection requires a geometries array"
+        for member in geometries:
+            error = geometry_error(member)
+            if error:
+                return error
+        return None
+
+    if 'coordinates' not in geometry:
+        return f"{geometry_type} requires coordinates"
+    error = _coordinates_error(geometry['coordinates'], COORDINATE_DEPTH[geometry_type])
+    if error:
+        return error
+    return _shape_error(geometry_type, geometry['coordinates'])
+
+
+def feature_error(feature: Any) -> Optional[str]:
+    """Return a description of what is wrong with a GeoJSON Feature, or None if valid"""
+    if not isinstance(feature, dict):
+        return "feature must be an object"
+    if feature.get('type') != 'Feature':
+        return "type must be Feature"
+    if not isinstance(feature.get('properties', {}), (dict, type(None))):
+        return "properties must be an object"
+    return geometry_error(feature.get('geometry'))
+
+
+def boundary_feature_error(feature: Any) -> Optional[str]:
+    """Return a description of what is wrong with a project boundary Feature, or None if valid"""
+    error = feature_error(feature)
+    if error:
+        return error
+    if feature['geometry']['type'] not in BOUNDARY_TYPES:
+        return "boundary geometry must be a Polygon or MultiPolygon"
+    return None
@@ -11,6 +11,12 @@ import asyncio
 from app.core.data_manager import CimWizardDataManager, FeatureMethodSelector
 
 
+# Dependency-resolved execution order per (configuration, requested features).
+# Shared across the per-request executors since it only depends on configuration.
+_EXECUTION_ORDER_CACHE: Dict[tuple, List[str]] = {}
+_EXECUTION_ORDER_CACHE_SIZE = 256
+
+
 class CimWizardPipelineExecutor:
     """
     CIM Wizard Pipeline Executor
@@ -242,6 +248,22 @@ class CimWizardPipelineExecutor:
         
         return required
     
+    def resolve_execution_order(self, features: List[str]) -> List[str]:
+        """Get required features in dependency order, cached per configuration"""
+        config_key = self.data_manager.configuration_key
+        if config_key is None:
+            return self._topological_sort(self.get_required_features(features))
+        
+        cache_key = (config_key, frozenset(features))
+        sorted_features = _EXECUTION_ORDER_CACHE.get(cache_key)
+        if sorted_features is None:
+            sorted_features = self._topological_sort(self.get_required_features(features))
+            if len(_EXECUTION_ORDER_CACHE) >= _EXECUTION_ORDER_CACHE_SIZE:
+                _EXECUTION_ORDER_CACHE.clear()
+            _EXECUTION_ORDER_CACHE[cache_key] = sorted_features
+        
+        return list(sorted_features)
+    
     # === FEATURE EXECUTION ===
     
     def execute_feature(self, feature_name: str, explicit_method: str = None) -> bool:
@@ -339,11 +361,8 @@ class CimWizardPipelineExecutor:
     
     def execute_pipeline(self, features: List[str], parallel: bool = False) -> Dict[str, Any]:
         """Execute a pipeline to calculate multiple features"""
-        # Get all required features including dependencies
-        all_features = self.get_required_features(features)
-        
-        # Sort features by dependency order
-        sorted_features = self._topological_sort(all_features)
+        # Get all required features sorted by dependency order
+        sorted_features = self.resolve_execution_order(features)
         
         results = {
             'requested_features': features,
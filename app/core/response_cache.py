@@ -0,0 +1,48 @@
+"""
+In-process response cache
+Keeps serialized JSON bodies of read-heavy endpoints for a short TTL
+"""
+
+import time
+from threading import Lock
+from typing import Callable, Dict, Hashable, Tuple
+
+from app.core.settings import settings
+
+
+MAX_ENTRIES = 256
+
+_cache: Dict[Hashable, Tuple[float, bytes]] = {}
+_lock = Lock()
+
+
+def get_or_build(key: Hashable, build: Callable[[], bytes], ttl: int = None) -> bytes:
+    """Return the cached body for key, building and storing it if missing or expired"""
+    ttl = settings.RESPONSE_CACHE_TTL if ttl is None else ttl
+    now = time.monotonic()
+
+    with _lock:
+        entry = _cache.get(key)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    body = build()
+    if ttl > 0:
+        with _lock:
+            if len(_cache) >= MAX_ENTRIES:
+                # Drop expired entries so paginated keys cannot grow without bound
+                for expired in [k for k, (expires_at, _) in _cache.items() if expires_at <= now]:
+                    del _cache[expired]
+            if len(_cache) < MAX_ENTRIES:
+                _cache[key] = (now + ttl, body)
+    return body
+
+
+def invalidate(namespace: str = None):
+    """Drop cached bodies whose key tuple starts with namespace (all entries if None)"""
+    with _lock:
+        if namespace is None:
+            _cache.clear()
+            return
+        for key in [k for k in _cache if isinstance(k, tuple) and k and k[0] == namespace]:
+            del _cache[key]
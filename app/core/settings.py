@@ -60,6 +60,13 @@ class Settings(BaseSettings):
     POOL_PRE_PING: bool = Field(default=True, description="Database connection pool pre-ping")
     POOL_RECYCLE: int = Field(default=3600, description="Database connection pool recycle time")
     
+    # ====================
+    # Response Caching
+    # ====================
+    RESPONSE_CACHE_TTL: int = Field(default=30, description="Seconds to cache read-heavy responses (0 disables)")
+    OSM_CACHE_DIR: str = Field(default="~/.cim_wizard/osm_cache", description="Directory for cached Overpass API responses")
+    OSM_CACHE_TTL: int = Field(default=86400, description="Seconds to reuse cached Overpass API responses (0 disables)")
+    
     # ====================
     # Development Settings
     # ====================
@@ -0,0 +1,26 @@
+"""
+Summary statistics helpers
+Shared by the pipeline and complete-chain routers
+"""
+
+import math
+from typing import Iterable, Tuple
+
+
+def compute_list_statistics(values: Iterable[float]) -> Tuple[float, float, float, float]:
+    """Single pass over values returning (average, max, min, total)"""
+    total = 0.0
+    minimum = math.inf
+    maximum = -math.inf
+    count = 0
+    for value in values:
+        total += value
+        count += 1
+        if value < minimum:
+            minimum = value
+        if value > maximum:
+            maximum = value
+    
+    if not count:
+        return 0, 0, 0, 0
+    return total / count, maximum, minimum, total
@@ -63,6 +63,63 @@ def create_all_schemas():
         print(f"Created schemas: {', '.join(schemas)}")
 
 
+def ensure_spatial_indexes():
+    """Create GiST indexes on spatial columns that tables created outside SQLAlchemy may lack"""
+    spatial_columns = [
+        ('cim_vector', 'building', 'building_geometry'),
+    ]
+    with engine.connect() as connection:
+        for schema, table, column in spatial_columns:
+            # Skip if any GiST index already covers the column (e.g. the one GeoAlchemy2 creates)
+            # Possible errors: Table does not exist yet, insufficient privileges
+            connection.execute(text(f"""
+                DO $$
+                BEGIN
+                    IF to_regclass('{schema}.{table}') IS NOT NULL AND NOT EXISTS (
+                        SELECT 1 FROM pg_indexes
+                        WHERE schemaname = '{schema}' AND tablename = '{table}'
+                          AND indexdef ILIKE '%USING gist ({column})%'
+                    ) THEN
+                        CREATE INDEX idx_{table}_{column}_gist ON {schema}.{table} USING GIST ({column});
+                    END IF;
+                END
+                $$
+            """))
+        
+        connection.commit()
+
+
+# Indexes added to existing tables after their first release (create_all skips tables that exist)
+CONCURRENT_INDEXES = [
+    ('cim_vector', 'idx_building_properties_scenario_lod',
+     "ON cim_vector.building_properties (project_id, scenario_id, lod, building_id) "
+     "INCLUDE (height, area, volume, filter_res, n_people, n_family)"),
+    ('cim_vector', 'idx_grid_line_scenario_network',
+     "ON cim_vector.grid_line (project_id, scenario_id, network_id)"),
+]
+
+
+def ensure_concurrent_indexes():
+    """Build indexes missing from existing tables without blocking writes; a failure only logs a warning"""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for schema, name, definition in CONCURRENT_INDEXES:
+            try:
+                # An interrupted concurrent build leaves an invalid index that IF NOT EXISTS would keep
+                invalid = connection.execute(text("""
+                    SELECT 1 FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = :schema AND c.relname = :name AND NOT i.indisvalid
+                """), {'schema': schema, 'name': name}).first()
+                if invalid:
+                    connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {schema}.{name}"))
+                connection.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}"))
+            except Exception as e:
+                # Possible errors: Insufficient privileges, table does not exist yet
+                print(f"Warning: could not create index {schema}.{name}: {str(e)}")
+
+
 def get_census_db():
     """Get database session specifically for census operations"""
     # This could be configured to use a different connection if needed
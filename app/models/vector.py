@@ -3,7 +3,7 @@ Vector data models for CIM Wizard Integrated
 Uses cim_vector schema
 """
 
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, ForeignKey, JSON, BigInteger, func, ForeignKeyConstraint
+from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, ForeignKey, JSON, BigInteger, func, ForeignKeyConstraint, Index
 from sqlalchemy.orm import relationship
 from geoalchemy2 import Geometry
 from app.db.database import Base
@@ -81,6 +81,12 @@ class BuildingProperties(Base):
             ['project_id', 'scenario_id'],
             ['cim_vector.project_scenario.project_id', 'cim_vector.project_scenario.scenario_id']
         ),
+        # Covering index for the scenario GeoJSON query (index-only scan of the rendered columns)
+        Index(
+            'idx_building_properties_scenario_lod',
+            'project_id', 'scenario_id', 'lod', 'building_id',
+            postgresql_include=['height', 'area', 'volume', 'filter_res', 'n_people', 'n_family']
+        ),
         {'schema': 'cim_vector'}
     )
     
@@ -163,7 +169,11 @@ class GridBus(Base):
 class GridLine(Base):
     """Grid line model"""
     __tablename__ = 'grid_line'
-    __table_args__ = {'schema': 'cim_vector'}
+    __table_args__ = (
+        # Compound index matching the scenario/network filter of the gridline endpoints
+        Index('idx_grid_line_scenario_network', 'project_id', 'scenario_id', 'network_id'),
+        {'schema': 'cim_vector'}
+    )
     
     # Primary key
     id = Column(Integer, primary_key=True, autoincrement=True)
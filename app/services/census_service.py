@@ -9,11 +9,23 @@ from sqlalchemy import and_, or_, func, text
 from geoalchemy2.functions import ST_Intersects, ST_Contains, ST_AsGeoJSON, ST_GeomFromText
 from shapely.geometry import shape, mapping, Polygon, MultiPolygon
 import json
+import orjson
 
 from app.models.census import CensusGeo
 from app.db.database import SessionLocal
 
 
+# Census columns rendered as GeoJSON feature properties
+CENSUS_FEATURE_PROPERTIES = (
+    'SEZ2011', 'COMUNE',
+    'P1', 'PF1',  # Total population, total families
+    'E8', 'E9', 'E10', 'E11', 'E12', 'E13', 'E14', 'E15', 'E16',  # Building age periods (before 1918 .. after 2005)
+    'E3', 'E4',  # Total and residential buildings
+    'crs'
+)
+CENSUS_FEATURE_PROPERTY_KEYS = tuple(orjson.dumps(name) + b':' for name in CENSUS_FEATURE_PROPERTIES)
+
+
 class CensusService:
     """Service for direct census data access"""
     
@@ -27,6 +39,15 @@ class CensusService:
         if self.should_close_db and self.db:
             self.db.close()
     
+    def _polygon_wkt(self, polygon_coords: List[List[float]]) -> str:
+        """Build a closed WKT polygon from [lon, lat] coordinates"""
+        # Ensure polygon is closed
+        if polygon_coords[0] != polygon_coords[-1]:
+            polygon_coords.append(polygon_coords[0])
+        
+        coords_str = ', '.join([f"{lon} {lat}" for lon, lat in polygon_coords])
+        return f"POLYGON(({coords_str}))"
+    
     def get_census_by_polygon(self, polygon_coords: List[List[float]]) -> Dict[str, Any]:
         """
         Get census zones that intersect with a given polygon
@@ -38,17 +59,29 @@ class CensusService:
             GeoJSON FeatureCollection with census data
         """
         try:
-            # Ensure polygon is closed
-            if polygon_coords[0] != polygon_coords[-1]:
-                polygon_coords.append(polygon_coords[0])
+            return orjson.loads(self.get_census_by_polygon_geojson(polygon_coords, raise_errors=True))
+        except Exception as e:
+            # Possible errors: Invalid polygon, database connection issues
+            print(f"Error getting census by polygon: {str(e)}")
+            return {"type": "FeatureCollection", "features": []}
+    
+    def get_census_by_polygon_geojson(self, polygon_coords: List[List[float]], raise_errors: bool = False) -> bytes:
+        """
+        Get census zones that intersect with a given polygon as serialized GeoJSON
+        
+        Args:
+            polygon_coords: List of [lon, lat] coordinates
+            raise_errors: Re-raise query errors instead of returning an empty collection
             
-            # Create WKT polygon
-            coords_str = ', '.join([f"{lon} {lat}" for lon, lat in polygon_coords])
-            polygon_wkt = f"POLYGON(({coords_str}))"
+        Returns:
+            GeoJSON FeatureCollection bytes, built without per-feature dicts
+        """
+        try:
+            polygon_wkt = self._polygon_wkt(polygon_coords)
             
-            # Query census zones that intersect with the polygon
+            # Query only the rendered census columns; PostGIS serializes the geometry
             census_zones = self.db.query(
-                CensusGeo,
+                *[getattr(CensusGeo, name) for name in CENSUS_FEATURE_PROPERTIES],
                 ST_AsGeoJSON(CensusGeo.geometry).label('geojson')
             ).filter(
                 ST_Intersects(
@@ -57,44 +90,23 @@ class CensusService:
                 )
             ).all()
             
-            # Format as GeoJSON FeatureCollection
+            # Concatenate pre-serialized properties and geometry fragments into the FeatureCollection
             features = []
-            for zone, geojson in census_zones:
-                feature = {
-                    "type": "Feature",
-                    "properties": {
-                        "SEZ2011": zone.SEZ2011,
-                        "COMUNE": zone.COMUNE,
-                        "P1": zone.P1,  # Total population
-                        "PF1": zone.PF1,  # Total families
-                        # Building age periods
-                        "E8": zone.E8,   # Before 1918
-                        "E9": zone.E9,   # 1919-1945
-                        "E10": zone.E10, # 1946-1960
-                        "E11": zone.E11, # 1961-1970
-                        "E12": zone.E12, # 1971-1980
-                        "E13": zone.E13, # 1981-1990
-                        "E14": zone.E14, # 1991-2000
-                        "E15": zone.E15, # 2001-2005
-                        "E16": zone.E16, # After 2005
-                        # Housing statistics
-                        "E3": zone.E3,   # Total buildings
-                        "E4": zone.E4,   # Residential buildings
-                        "crs": zone.crs
-                    },
-                    "geometry": json.loads(geojson)
-                }
-                features.append(feature)
+            for zone in census_zones:
+                properties = b','.join(
+                    key + orjson.dumps(value) for key, value in zip(CENSUS_FEATURE_PROPERTY_KEYS, zone)
+                )
+                geometry = zone.geojson.encode() if zone.geojson is not None else b'null'
+                features.append(b'{"type":"Feature","properties":{%s},"geometry":%s}' % (properties, geometry))
             
-            return {
-                "type": "FeatureCollection",
-                "features": features
-            }
+            return b'{"type":"FeatureCollection","features":[' + b','.join(features) + b']}'
             
         except Exception as e:
+            if raise_errors:
+                raise
             # Possible errors: Invalid polygon, database connection issues
             print(f"Error getting census by polygon: {str(e)}")
-            return {"type": "FeatureCollection", "features": []}
+            return b'{"type":"FeatureCollection","features":[]}'
     
     def get_census_by_id(self, census_id: int) -> Optional[CensusGeo]:
         """
@@ -3,7 +3,7 @@ Raster Service - Direct database access to raster data
 Replaces API calls with direct database queries for DTM/DSM data
 """
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from sqlalchemy.orm import Session
 from sqlalchemy import text, and_, func
 from geoalchemy2.functions import ST_AsGeoJSON, ST_GeomFromText, ST_Intersects
@@ -130,27 +130,34 @@ class RasterService:
         Returns:
             List of height calculation results
         """
-        results = []
+        return list(self.iter_building_heights(features))
+    
+    def iter_building_heights(self, features: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Calculate heights for multiple buildings, yielding each result as it completes
         
+        Args:
+            features: List of GeoJSON features with building_id and geometry
+            
+        Yields:
+            Height calculation result per feature
+        """
         for feature in features:
             building_id = feature.get("properties", {}).get("building_id")
             geometry = feature.get("geometry")
             
             if not geometry:
-                results.append({
+                yield {
                     "building_id": building_id,
                     "status": "error",
                     "error": "Missing geometry"
-                })
+                }
                 continue
             
-            height_data = self.calculate_building_height(
+            yield self.calculate_building_height(
                 building_geometry=geometry,
                 building_id=building_id
             )
-            results.append(height_data)
-        
-        return results
     
     def get_cached_height(self, building_id: str, 
                          project_id: str = None, 
@@ -3,13 +3,16 @@ CIM Wizard Integrated - FastAPI Application
 Integrated service combining vector, census, and raster services with direct database access
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
+from sqlalchemy.exc import SQLAlchemyError
 
 from app.api import vector_routes, pipeline_routes, census_routes, raster_routes, complete_chain_route, building_analysis_route
 from app.db.database import engine, Base
-from app.db.database import create_all_schemas
+from app.db.database import create_all_schemas, ensure_spatial_indexes, ensure_concurrent_indexes
 from app.core.settings import settings
 
 
@@ -20,6 +23,8 @@ async def lifespan(app: FastAPI):
     print("Creating database schemas...")
     create_all_schemas()
     Base.metadata.create_all(bind=engine)
+    ensure_spatial_indexes()
+    ensure_concurrent_indexes()
     print("Database schemas created successfully")
     yield
     # Shutdown
@@ -46,6 +51,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON/GeoJSON responses for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Database errors raised by routes without their own error handling
+@app.exception_handler(SQLAlchemyError)
+async def database_error_handler(request: Request, exc: SQLAlchemyError):
+    # Possible errors: Database connection issues, invalid queries, constraint violations
+    return ORJSONResponse(status_code=500, content={"detail": f"Database error: {str(exc)}"})
+
+
 # Include routers
 app.include_router(
     vector_routes.router,